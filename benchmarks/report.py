@@ -0,0 +1,74 @@
+"""Results of the benchmarks: printed as a table, saved as JSON, and compared to an earlier run."""
+import sys
+import json
+import platform
+
+
+def add_arguments(parser):
+    """Adds --json, --compare and --threshold to an argparse parser."""
+    parser.add_argument("--json", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown counted as a regression, 0.1 is 10%%")
+
+
+def load(path, key):
+    """The times under 'key' in the JSON results at 'path', or None without a path."""
+    if not path:
+        return None
+    with open(path, encoding="utf8") as f:
+        return json.load(f)[key]
+
+
+def save(path, key, times, parameters, **extra):
+    """Writes 'times' under 'key' to the JSON results at 'path', with the parameters and platform."""
+    results = {
+        "parameters": parameters,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        key: times,
+        **extra,
+    }
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(results, f, indent=2)
+
+
+def print_table(times, names, label, previous=None, total=False):
+    """Prints the seconds of each of 'names', and how they changed since 'previous'. With 'total',
+    also their share of the total, and the total itself."""
+    rows = list(names)
+    if total:
+        times = dict(times, total=sum(times[name] for name in names))
+        if previous:
+            previous = dict(previous, total=sum(previous.values()))
+        rows.append("total")
+
+    header = f"{label:<12}{'seconds':>10}" + (f"{'share':>8}" if total else "")
+    if previous:
+        header += f"{'before':>10}{'change':>9}"
+    print(header)
+    print("-" * len(header))
+
+    for name in rows:
+        seconds = times[name]
+        row = f"{name:<12}{seconds:>10.3f}"
+        if total:
+            row += f"{seconds / times['total']:>8.0%}" if times["total"] else f"{'':>8}"
+        if previous:
+            before = previous.get(name, 0.0)
+            change = f"{(seconds - before) / before:>+9.1%}" if before else f"{'':>9}"
+            row += f"{before:>10.3f}{change}"
+        print(row)
+
+
+def regressions(times, previous, names, threshold, min_seconds=0.01):
+    """Names that got slower than 'threshold', ignoring those too short to time reliably."""
+    return [name for name in names
+            if previous.get(name, 0.0) >= min_seconds and times[name] > previous[name] * (1 + threshold)]
+
+
+def exit_on_regressions(times, previous, names, threshold):
+    """Exits with code 1, listing what got slower than 'threshold' since 'previous', if anything did."""
+    slower = regressions(times, previous, names, threshold)
+    if slower:
+        print(f"\nRegressions over {threshold:.0%}: {', '.join(slower)}")
+        sys.exit(1)
@@ -0,0 +1,143 @@
+"""Times each stage of an Oboe build on a synthetic vault.
+
+    python -m benchmarks.run --notes 5000 --json before.json
+    python -m benchmarks.run --notes 5000 --compare before.json
+
+Stage times are exclusive: conversion covers turning Obsidian syntax into Markdown, embeds
+included, and rendering every markdown2 call, including the backlink blocks. Neither is counted
+again in the other stages. With --compare, the exit code is 1
+if any stage got slower than the threshold, so it can guard releases in CI.
+"""
+import shutil
+import argparse
+import tempfile
+from time import perf_counter
+from contextlib import contextmanager
+
+from oboe import LOG, BuildConfig
+from oboe.Vault import Vault
+from benchmarks.synthetic_vault import generate_vault, add_arguments, vault_arguments
+from benchmarks import report
+
+STAGES = ("discovery", "parsing", "backlinks", "conversion", "rendering", "writing")
+
+
+class StageTimer:
+    """Accumulates the exclusive wall time of nested stages."""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self._stack = []
+
+
+    @contextmanager
+    def stage(self, name):
+        start = perf_counter()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            children = self._stack.pop()
+            self.totals[name] += elapsed - children
+            if self._stack:
+                self._stack[-1] += elapsed
+
+
+class TimedVault(Vault):
+    """Vault that reports the time spent in each stage to a StageTimer."""
+
+    def __init__(self, timer, **kwargs):
+        self.timer = timer
+        super().__init__(**kwargs)
+
+
+    def _find_paths(self):
+        with self.timer.stage("discovery"):
+            return super()._find_paths()
+
+
+    def _parse_notes(self, md_paths):
+        with self.timer.stage("parsing"):
+            return super()._parse_notes(md_paths)
+
+
+    def _add_backlinks(self):
+        with self.timer.stage("backlinks"):
+            super()._add_backlinks()
+
+
+    def _convert_notes(self, notes, jobs=None, pool=None):
+        # Converted up front, so the time isn't counted as rendering, which takes the Markdown
+        with self.timer.stage("conversion"):
+            return iter(list(super()._convert_notes(notes, jobs, pool)))
+
+
+    def _render_markdown(self, texts, jobs=None, pool=None):
+        # Rendered up front, so the time isn't spread over whatever consumes the pages
+        with self.timer.stage("rendering"):
+            return iter(list(super()._render_markdown(texts, jobs, pool)))
+
+
+    def export_html(self):
+        with self.timer.stage("writing"):
+            super().export_html()
+
+
+def run_build(vault_root, output_dir, jobs=1):
+    """Builds the vault at 'vault_root' once, returning the time spent in each stage."""
+    timer = StageTimer()
+    config = BuildConfig(vault_root=vault_root, output_dir=output_dir)
+    vault = TimedVault(timer, extra_folders=[], jobs=jobs, config=config)
+    vault.export_html()
+
+    return timer.totals
+
+
+def benchmark(vault_root, jobs=1, repeat=3):
+    """Best time of each stage over 'repeat' builds, each into a fresh output directory."""
+    best = None
+    for _ in range(repeat):
+        output_dir = tempfile.mkdtemp(prefix="oboe-bench-out-")
+        try:
+            totals = run_build(vault_root, output_dir, jobs)
+        finally:
+            shutil.rmtree(output_dir)
+        best = totals if best is None else {stage: min(best[stage], totals[stage]) for stage in STAGES}
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times each stage of an Oboe build on a synthetic vault")
+    add_arguments(parser)
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes used by Oboe")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of builds, the best time of each stage is kept")
+    parser.add_argument("--vault", default=None, help="Generate the vault here and keep it, instead of a temporary directory")
+    report.add_arguments(parser)
+    args = parser.parse_args()
+
+    LOG.set_level("ERROR")
+
+    parameters = vault_arguments(args)
+    vault_root = args.vault or tempfile.mkdtemp(prefix="oboe-bench-vault-")
+    try:
+        generate_vault(vault_root, **parameters)
+        stages = benchmark(vault_root, jobs=args.jobs, repeat=args.repeat)
+    finally:
+        if not args.vault:
+            shutil.rmtree(vault_root)
+
+    previous = report.load(args.compare, "stages")
+    report.print_table(stages, STAGES, "stage", previous, total=True)
+
+    if args.json:
+        report.save(args.json, "stages", stages, dict(parameters, jobs=args.jobs, repeat=args.repeat),
+                    total=sum(stages.values()))
+
+    if previous:
+        report.exit_on_regressions(stages, previous, STAGES, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Times how long Oboe takes to start, in fresh interpreters, like every run from the command line.
+
+    python -m benchmarks.startup --json before.json
+    python -m benchmarks.startup --compare before.json --imports 10
+
+Each case runs in a new process: importing oboe, printing the help, and building a vault of a few
+notes, where starting up is most of the work. The fastest of --repeat runs is kept. With
+--compare, the exit code is 1 if any case got slower than the threshold. --imports lists the
+slowest imports of the build, as measured by python -X importtime.
+"""
+import sys
+import shutil
+import argparse
+import tempfile
+import subprocess
+from time import perf_counter
+
+from benchmarks.synthetic_vault import generate_vault
+from benchmarks import report
+
+CASES = ("import", "help", "build")
+
+
+def commands(vault_root, output_dir):
+    return {
+        "import": [sys.executable, "-c", "import oboe"],
+        "help": [sys.executable, "-m", "oboe", "--help"],
+        "build": [sys.executable, "-m", "oboe", vault_root, "-o", output_dir, "-l", "ERROR"],
+    }
+
+
+def time_command(command):
+    start = perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return perf_counter() - start
+
+
+def benchmark(vault_root, repeat=10):
+    """Fastest time of each case over 'repeat' runs."""
+    output_dir = tempfile.mkdtemp(prefix="oboe-startup-out-")
+    try:
+        return {case: min(time_command(command) for _ in range(repeat))
+                for case, command in commands(vault_root, output_dir).items()}
+    finally:
+        shutil.rmtree(output_dir)
+
+
+def slowest_imports(vault_root, count):
+    """The 'count' top-level imports of a build taking the longest, with their cumulative time in seconds."""
+    output_dir = tempfile.mkdtemp(prefix="oboe-startup-out-")
+    try:
+        command = commands(vault_root, output_dir)["build"]
+        result = subprocess.run([command[0], "-X", "importtime", *command[1:]],
+                                check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    finally:
+        shutil.rmtree(output_dir)
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented, and already counted in their parent
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            imports.append((int(cumulative) / 1e6, name.strip()))
+
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times how long Oboe takes to start")
+    parser.add_argument("--notes", type=int, default=5, help="Number of notes in the vault that is built")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of runs of each case, the fastest is kept")
+    parser.add_argument("--imports", type=int, default=0, help="Also list this many of the slowest imports of a build")
+    report.add_arguments(parser)
+    args = parser.parse_args()
+
+    vault_root = tempfile.mkdtemp(prefix="oboe-startup-vault-")
+    try:
+        generate_vault(vault_root, notes=args.notes)
+        times = benchmark(vault_root, repeat=args.repeat)
+        imports = slowest_imports(vault_root, args.imports) if args.imports else []
+    finally:
+        shutil.rmtree(vault_root)
+
+    previous = report.load(args.compare, "cases")
+    report.print_table(times, CASES, "case", previous)
+
+    if imports:
+        print(f"\n{'import':<40}{'seconds':>10}")
+        for seconds, name in imports:
+            print(f"{name:<40}{seconds:>10.3f}")
+
+    if args.json:
+        report.save(args.json, "cases", times, {"notes": args.notes, "repeat": args.repeat})
+
+    if previous:
+        report.exit_on_regressions(times, previous, CASES, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Generates reproducible synthetic Obsidian vaults for benchmarking Oboe.
+
+    python -m benchmarks.synthetic_vault <directory> --notes 5000 --depth 3
+"""
+import os
+import random
+import argparse
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut "
+    "labore et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris "
+    "nisi aliquip ex ea commodo consequat duis aute irure in reprehenderit voluptate velit esse "
+    "cillum fugiat nulla pariatur excepteur sint occaecat cupidatat non proident sunt culpa qui "
+    "officia deserunt mollit anim id est laborum"
+).split()
+
+CODE_BLOCK = "```python\ndef f(x):\n    return {\"key\": x}  # [[Not a link]] #not-a-tag\n```"
+
+# Number of subdirectories in every directory of the vault
+FANOUT = 3
+
+
+def note_title(i):
+    return f"Note {i:06d}"
+
+
+def note_dirs(depth):
+    """All directories of a vault 'depth' levels deep, the vault root included as ""."""
+    dirs = [""]
+    level = [""]
+    for _ in range(depth):
+        level = [os.path.join(parent, f"folder {j}") for parent in level for j in range(FANOUT)]
+        dirs += level
+
+    return dirs
+
+
+def note_text(rng, i, notes, note_size, link_density, tags, code_blocks, highlights, blockrefs):
+    """Text of note number 'i'. 'note_size' is in words, 'link_density' in links per 100 words."""
+    words = rng.choices(WORDS, k=note_size)
+
+    # Obsidian syntax is spliced in at random word positions
+    extras = []
+    for _ in range(int(note_size * link_density / 100)):
+        target = note_title(rng.randrange(notes))
+        kind = rng.random()
+        if kind < 0.1:
+            extras.append(f"[[{target}|alias]]")
+        elif kind < 0.2:
+            extras.append(f"[[{target}#Heading]]")
+        else:
+            extras.append(f"[[{target}]]")
+    if tags:
+        extras += [f"#tag-{rng.randrange(tags)}" for _ in range(rng.randint(1, 3))]
+    extras += [f"=={rng.choice(WORDS)} {rng.choice(WORDS)}==" for _ in range(highlights)]
+    extras += ["\n\n" + CODE_BLOCK + "\n\n" for _ in range(code_blocks)]
+
+    for extra in extras:
+        position = rng.randrange(len(words) + 1)
+        words.insert(position, extra)
+
+    # Break the words into paragraphs, ending some with a block reference
+    lines = [" ".join(words[start:start + 40]) for start in range(0, len(words), 40)]
+    for j in range(min(blockrefs, len(lines))):
+        lines[rng.randrange(len(lines))] += f" ^block-{j}"
+
+    return f"# {note_title(i)}\n\n## Heading\n\n" + "\n\n".join(lines) + "\n"
+
+
+def generate_vault(root, notes=1000, note_size=300, link_density=2.0, tags=50, depth=2,
+                   code_blocks=1, highlights=2, blockrefs=1, seed=0):
+    """Writes a synthetic vault of 'notes' notes into 'root'. The same arguments always give
+    the same vault."""
+    rng = random.Random(seed)
+    dirs = note_dirs(depth)
+    for folder in dirs:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+
+    for i in range(notes):
+        folder = dirs[i % len(dirs)]
+        text = note_text(rng, i, notes, note_size, link_density, tags, code_blocks, highlights, blockrefs)
+        with open(os.path.join(root, folder, note_title(i) + ".md"), "w", encoding="utf8") as f:
+            f.write(text)
+
+    return root
+
+
+def add_arguments(parser):
+    parser.add_argument("--notes", type=int, default=1000, help="Number of notes")
+    parser.add_argument("--note-size", type=int, default=300, help="Words per note")
+    parser.add_argument("--link-density", type=float, default=2.0, help="Links per 100 words")
+    parser.add_argument("--tags", type=int, default=50, help="Number of distinct tags")
+    parser.add_argument("--depth", type=int, default=2, help="Depth of the subdirectory tree")
+    parser.add_argument("--code-blocks", type=int, default=1, help="Code blocks per note")
+    parser.add_argument("--highlights", type=int, default=2, help="Highlights per note")
+    parser.add_argument("--blockrefs", type=int, default=1, help="Block references per note")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+
+def vault_arguments(args):
+    return dict(notes=args.notes, note_size=args.note_size, link_density=args.link_density,
+                tags=args.tags, depth=args.depth, code_blocks=args.code_blocks,
+                highlights=args.highlights, blockrefs=args.blockrefs, seed=args.seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates a synthetic Obsidian vault")
+    parser.add_argument("directory", help="Where to write the vault")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    generate_vault(args.directory, **vault_arguments(args))
@@ -0,0 +1,69 @@
+import os
+import hashlib
+from oboe.filecopy import up_to_date
+from oboe.profiling import profiled
+from oboe import LOG
+
+# Bytes hashed at a time, so large attachments aren't read into memory whole
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """Returns the SHA-1 digest of the file at 'path'."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class Assets:
+    """Local files the pages refer to, like stylesheets and embedded images, copied into the
+    output directory as they are. Files with the same content are copied once, and hardlinked
+    to that copy where the filesystem allows. With 'link', even the first copy is a hardlink of
+    the file in the vault."""
+
+    def __init__(self, link=False):
+        self.link = link
+        # Path in the output directory -> path of the file it is a copy of
+        self.files = {}
+
+
+    def add(self, source, out_path):
+        self.files[out_path] = source
+
+
+    def __len__(self):
+        return len(self.files)
+
+
+    @profiled("assets.copy")
+    def copy(self, writer):
+        """Hands every file to 'writer' to copy, grouped by content."""
+        stats = {}
+        for out_path, source in self.files.items():
+            try:
+                stats[out_path] = os.stat(source)
+            except FileNotFoundError:
+                LOG.warning(f"Cannot find \"{source}\", which is linked to, skipping it.")
+
+        for folder in {os.path.dirname(out_path) for out_path in stats}:
+            os.makedirs(folder, exist_ok=True)
+
+        # Only files of the same size can have the same content, so only those are hashed, and
+        # only when one of them changed
+        by_size = {}
+        for out_path, stat in stats.items():
+            by_size.setdefault(stat.st_size, []).append(out_path)
+
+        for out_paths in by_size.values():
+            if len(out_paths) == 1 or all(up_to_date(stats[out_path], out_path) for out_path in out_paths):
+                for out_path in out_paths:
+                    writer.copy(self.files[out_path], [out_path], self.link)
+                continue
+
+            by_content = {}
+            for out_path in sorted(out_paths):
+                by_content.setdefault(file_digest(self.files[out_path]), []).append(out_path)
+            for group in by_content.values():
+                writer.copy(self.files[group[0]], group, self.link)
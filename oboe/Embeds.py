@@ -0,0 +1,151 @@
+from contextlib import contextmanager, nullcontext
+import regex as re
+from oboe.utils import slug_case
+from oboe.format import convert_obsidian_syntax
+from oboe.Link import links_in_text
+from oboe.NoteIndex import note_path, read_note
+from oboe import LOG
+from oboe import GLOBAL
+
+# Embeds nested deeper than this are linked to instead
+MAX_EMBED_DEPTH = 8
+
+HEADING = re.compile(r"^(#{1,6})[ \t]+(.*?)[ \t#]*$", re.MULTILINE)
+# Fenced code blocks, in which a line starting with # is not a heading. Unclosed ones run to the end.
+FENCE = re.compile(r"^[ \t]*((`|~)\2{2,})[^\n]*\n.*?(?:^[ \t]*\1\2*[ \t]*$|\Z)", re.MULTILINE | re.DOTALL)
+LIST_ITEM = re.compile(r"[ \t]*(?:[-*+]|\d+[.)])[ \t]")
+
+
+class Embeds:
+    """Resolves ![[embeds]] into the converted Markdown of the embedded note, heading section or
+    block. Each of those is extracted and converted once per build. The notes embedded by every
+    page, directly or through other embeds, are recorded in 'dependencies', so a change to an
+    embedded note rebuilds exactly the pages that show it."""
+
+    def __init__(self):
+        # (note key, header, blockref) -> (Markdown, keys of the notes it consists of)
+        self.fragments = {}
+        self.texts = {}
+        self.dependencies = {}
+        # Fragments being converted, to catch embeds that embed themselves
+        self._stack = []
+        self._collecting = None
+        self.cycles = 0
+
+
+    @contextmanager
+    def embedding(self, key):
+        """Records the notes embedded while the note with the key 'key' is converted."""
+        previous = self._stack, self._collecting
+        self._stack = [(key, None, None)]
+        self._collecting = self.dependencies[key] = set()
+        try:
+            yield
+        finally:
+            self._stack, self._collecting = previous
+
+
+    def content(self, link):
+        """Returns the converted Markdown 'link' embeds, or None if there is nothing to embed."""
+        fragment = (link.target, link.header, link.blockref)
+        if fragment in self._stack:
+            LOG.warning(f"\"{link.obsidian_link}\" embeds itself, linking to it instead.")
+            self.cycles += 1
+            return None
+        if len(self._stack) > MAX_EMBED_DEPTH:
+            LOG.warning(f"Embeds are nested more than {MAX_EMBED_DEPTH} deep at \"{link.obsidian_link}\", linking to it instead.")
+            self.cycles += 1
+            return None
+
+        memo = self.fragments.get(fragment)
+        if memo is None:
+            memo = self._convert(fragment)
+
+        markdown, dependencies = memo
+        if self._collecting is not None:
+            self._collecting.update(dependencies)
+        return markdown
+
+
+    def _convert(self, fragment):
+        cycles = self.cycles
+        dependencies = {fragment[0]}
+        previous = self._collecting
+        self._stack.append(fragment)
+        self._collecting = dependencies
+        try:
+            text = self._extract(*fragment)
+            markdown = None if text is None else convert_obsidian_syntax(text, links_in_text(text))
+        finally:
+            self._stack.pop()
+            self._collecting = previous
+
+        memo = (markdown, frozenset(dependencies))
+        # What a loop was cut short at depends on where it was entered, so that isn't kept
+        if self.cycles == cycles:
+            self.fragments[fragment] = memo
+        return memo
+
+
+    def _extract(self, key, header, blockref):
+        text = self.texts.get(key)
+        if text is None:
+            try:
+                text = self.texts[key] = read_note(note_path(key))
+            except FileNotFoundError:
+                return None
+
+        if blockref is not None:
+            return extract_block(text, blockref)
+        if header is not None:
+            return extract_section(text, header)
+        return text
+
+
+    def invalidate(self, keys):
+        """Forgets everything extracted from the notes with the keys in 'keys', which changed.
+        Returns the keys of the pages that embed any of them."""
+        keys = set(keys)
+        for key in keys:
+            self.texts.pop(key, None)
+        self.fragments = {fragment: memo for fragment, memo in self.fragments.items() if not keys & memo[1]}
+        return [page for page, dependencies in self.dependencies.items() if keys & dependencies]
+
+
+def embedding(key):
+    """Records the embeds of the note with the key 'key' in GLOBAL.EMBEDS, if embeds are resolved."""
+    return GLOBAL.EMBEDS.embedding(key) if GLOBAL.EMBEDS is not None else nullcontext()
+
+
+def extract_section(text, header):
+    """Returns the section under the heading 'header' in 'text', up to the next heading of the same
+    or a higher level, or None if there is no such heading."""
+    fences = [fence.span() for fence in FENCE.finditer(text)]
+    headings = [heading for heading in HEADING.finditer(text)
+                if not any(start <= heading.start() < end for start, end in fences)]
+    for i, heading in enumerate(headings):
+        if slug_case(heading.group(2)) != slug_case(header):
+            continue
+        level = len(heading.group(1))
+        end = next((other.start() for other in headings[i + 1:] if len(other.group(1)) <= level), len(text))
+        return text[heading.start():end].strip("\n")
+
+    return None
+
+
+def extract_block(text, blockref):
+    """Returns the paragraph or list item marked with ' ^blockref' in 'text', without the marker,
+    or None if there is no such block."""
+    marker = re.search(rf"[ \t]\^{re.escape(blockref)}[ \t]*$", text, re.MULTILINE)
+    if marker is None:
+        return None
+
+    line_start = text.rfind("\n", 0, marker.start()) + 1
+    if LIST_ITEM.match(text, line_start):
+        start = line_start
+    else:
+        # The marker ends a paragraph, which starts after the last blank line
+        start = text.rfind("\n\n", 0, marker.start())
+        start = 0 if start == -1 else start + 2
+
+    return text[start:marker.start()]
@@ -1,7 +1,10 @@
-import regex as re
 from oboe.utils import slug_case, md_link
+from oboe.patterns import OBSIDIAN_SYNTAX, EXTENDED_LINK
+from oboe.Template import SITE_ROOT
 from oboe import LOG
 import os
+import sys
+from urllib.parse import quote
 from oboe import GLOBAL
 
 LINK_SYNTAX = {
@@ -11,49 +14,88 @@ LINK_SYNTAX = {
 }
 
 class Link:
-    def __init__(self, text, embed=None):
+    # Vaults have many links, so they are kept without a __dict__
+    __slots__ = ("obsidian_link", "path", "header", "alias", "blockref",
+                 "resolved", "attachment", "target", "embed", "slug")
+
+    def __init__(self, text, embed=None, target=None):
         self.obsidian_link = text
-        extended_link = re.match(r"([^#|^\n]+)([#|]\^?)(.*)", text)
+        self.header = self.alias = self.blockref = None
+        extended_link = EXTENDED_LINK.match(text)
 
         if extended_link:
             # Is extended link, set attribute corresponding to the correct link type
-            self.path = os.path.join(*extended_link.group(1).split("/")) # Ensures correct path separators
+            self.path = sys.intern(os.path.join(*extended_link.group(1).split("/"))) # Ensures correct path separators
             setattr(self, LINK_SYNTAX[extended_link.group(2)], extended_link.group(3))
-            LOG.debug(f"Link(\"{text}\") is extended. self.path: {self.path}")
+            LOG.debug("Link(\"%s\") is extended. self.path: %s", text, self.path)
         else:
             # Is regular link, just set path
-            self.path = os.path.join(*text.split("/")) # Ensures correct path separators
-            LOG.debug(f"Link(\"{text}\") is not extended. self.path: {self.path}")
+            self.path = sys.intern(os.path.join(*text.split("/"))) # Ensures correct path separators
+            LOG.debug("Link(\"%s\") is not extended. self.path: %s", text, self.path)
 
-        if not os.path.isfile(os.path.join(GLOBAL.VAULT_ROOT, self.path + ".md")):
-            LOG.debug("Link not absolute, trying relative...")
+        # The note this link points to, resolved against the vault's note index. Unresolved links
+        # keep their path, so links to the same missing note still share a target.
+        if target is None and GLOBAL.NOTE_INDEX is not None:
+            target = GLOBAL.NOTE_INDEX.resolve(self.path)
+        self.resolved = target is not None
+        # Links to other files in the vault, like images, point to attachments, which are copied
+        # into the output as they are. Those are resolved like notes, by path or unique name.
+        self.attachment = None
+        if not self.resolved and GLOBAL.ATTACHMENTS is not None:
+            self.attachment = GLOBAL.ATTACHMENTS.resolve(self.path)
+            if self.attachment is not None:
+                target = self.attachment
+        # Interned, as the same targets and slugs recur throughout the vault
+        self.target = sys.intern(target if target is not None else self.path.replace(os.sep, "/"))
 
-        if embed:
-            # Is embed, run function to get the content of the link destination
-            self.content = self.get_content()
+        # Embeds are only resolved when the note is converted, as the content may not be needed
+        self.embed = bool(embed)
 
-        self.slug = "/".join(list(map(lambda x: slug_case(x), text.split("/"))))
+        self.slug = sys.intern("/".join(list(map(lambda x: slug_case(x), text.split("/")))))
 
 
     def get_content(self):
-        """Gets the content residing at the link destination"""
-        pass
+        """Gets the content residing at the link destination, converted into Markdown, or None if
+        it can't be embedded."""
+        if not self.resolved or GLOBAL.EMBEDS is None:
+            return None
+        return GLOBAL.EMBEDS.content(self)
+
+    def url(self):
+        """URL of the page of the linked note, relative to the output root, which the template
+        turns into a path relative to each page. Links to missing notes keep the slug of their text."""
+        if not self.resolved:
+            return self.slug
+        # Pages keep the folders of their notes, only their file name is slugged
+        folder, _, name = self.target.rpartition("/")
+        return SITE_ROOT + quote(f"{folder}/{slug_case(name)}" if folder else slug_case(name))
 
     def md_link(self):
-        # if self.slugpath:
-        #     self.slug = self.slugpath
         """Returns a link string that follows the Markdown specification"""
-        if hasattr(self, "alias"):
-            alias = getattr(self, "alias")
-            return md_link(alias, self.slug)
-        elif hasattr(self, "header"):
-            header = getattr(self, "header")
-            return md_link(header, f"{self.slug}", extended=f"#{slug_case(header)}")
-        elif hasattr(self, "blockref"):
-            blockref = getattr(self, "blockref")
-            return md_link(self.path, f"{self.slug}", extended=f"#{blockref}")
+        url = self.url()
+        if self.alias is not None:
+            return md_link(self.alias, url)
+        elif self.header is not None:
+            return md_link(self.header, url, extended=f"#{slug_case(self.header)}")
+        elif self.blockref is not None:
+            return md_link(self.path, url, extended=f"#{self.blockref}")
         else:
-            return md_link(self.path, self.slug)
+            return md_link(self.path, url)
 
     def __eq__(self, other):
         return self.path == other.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+def links_in_text(text):
+    """Returns a list of all wiki-links and embeds in 'text'. Found by the same scanner that
+    converts them, so links in code, which stay as they are, aren't links here either."""
+    links = []
+    for match in OBSIDIAN_SYNTAX.finditer(text):
+        if match.lastgroup == "link":
+            links.append(Link(match.group("link"), embed=match.group("embed")))
+        elif match.lastgroup == "highlight":
+            links.extend(links_in_text(match.group("highlight")))
+    return links
@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+from oboe import LOG
+from oboe import GLOBAL
+
+MANIFEST_FILENAME = ".oboe-manifest.json"
+MANIFEST_VERSION = 2
+
+
+def file_hash(path):
+    """Returns the SHA-1 hex digest of the file at 'path'."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class Manifest:
+    """On-disk record of the last build, used to only re-render what changed."""
+
+    def __init__(self, output_dir, template="", options=(), stats=None):
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.fingerprint = self.build_fingerprint(template, options)
+        self.entries = {}
+        self.old_entries = {}
+        self._hashes = {}
+        # Stat data of the notes by key, from when they were found, so they aren't stat'ed twice
+        self.stats = stats or {}
+        # Output paths of the stylesheets and attachments copied by the build
+        self.assets = []
+        self.old_assets = []
+
+        try:
+            with open(self.path, encoding="utf8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION and data.get("fingerprint") == self.fingerprint:
+                self.old_entries = data["entries"]
+                self.old_assets = data.get("assets", [])
+            else:
+                LOG.info("Template or options changed since last build, re-rendering all notes.")
+        except FileNotFoundError:
+            LOG.info("No build manifest found, rendering all notes.")
+        except (ValueError, KeyError):
+            LOG.warning(f"Build manifest at \"{self.path}\" is corrupt, rendering all notes.")
+
+
+    @staticmethod
+    def build_fingerprint(template, options=()):
+        """Hashes everything besides the note itself that affects a rendered page, including
+        the 'options' of the build that affect the output."""
+        options = [template, GLOBAL.HTML_LINK_EXTENSIONS, GLOBAL.BACKLINK_DASH, GLOBAL.RENDERER, *options]
+        return hashlib.sha1(json.dumps(options).encode("utf8")).hexdigest()
+
+
+    def key(self, note):
+        return os.path.relpath(note.path, GLOBAL.VAULT_ROOT).replace(os.sep, "/")
+
+
+    def source_hash(self, key):
+        """Returns the hash of the note with the manifest key 'key' and its stat data, or None for
+        each if there is no such note. Each note is hashed at most once per build."""
+        if key not in self._hashes and GLOBAL.SOURCES is not None:
+            # Notes given as text have no stat data, so they are keyed on the hash of the text alone
+            text = GLOBAL.SOURCES.get(key)
+            if text is None:
+                return None, None
+            self._hashes[key] = hashlib.sha1(text.encode("utf8")).hexdigest(), None
+        elif key not in self._hashes:
+            stat = self.stats.get(key)
+            try:
+                stat = stat or os.stat(os.path.join(GLOBAL.VAULT_ROOT, key))
+            except FileNotFoundError:
+                return None, None
+            old = self.old_entries.get(key)
+
+            # Only hash the file if its stat data changed since the last build
+            if old and old["mtime"] == stat.st_mtime_ns and old["size"] == stat.st_size:
+                self._hashes[key] = old["hash"], stat
+            else:
+                self._hashes[key] = file_hash(os.path.join(GLOBAL.VAULT_ROOT, key)), stat
+
+        return self._hashes[key]
+
+
+    def record(self, note):
+        """Returns the manifest entry describing the current state of 'note'."""
+        key = self.key(note)
+        content_hash, stat = self.source_hash(key)
+        old = self.old_entries.get(key)
+
+        entry = {
+            "mtime": stat.st_mtime_ns if stat else None,
+            "size": stat.st_size if stat else None,
+            "hash": content_hash,
+            "out_path": note.out_path,
+            "links": sorted(set(note.targets)),
+            "tags": sorted(set(note.tags)),
+            "backlinks": [link.target for link in note.backlinks],
+            # Hash of every note the page embeds, kept until the page is rendered again
+            "embeds": old.get("embeds", {}) if old else {},
+        }
+        self.entries[key] = entry
+        return entry
+
+
+    def record_embeds(self, note, keys):
+        """Records that the page of 'note' embeds the notes with the link keys in 'keys'."""
+        entry = self.entries.get(self.key(note))
+        if entry is not None:
+            entry["embeds"] = {key: self.source_hash(key + ".md")[0] for key in sorted(keys)}
+
+
+    def needs_render(self, note):
+        """Returns True if 'note' has to be rendered again: its source, links, backlinks or the
+        notes it embeds changed."""
+        entry = self.record(note)
+        old = self.old_entries.get(self.key(note))
+        if old is None or not os.path.isfile(note.out_path):
+            return True
+
+        if any(old.get(field) != entry[field] for field in ("hash", "out_path", "links", "backlinks")):
+            return True
+        return any(self.source_hash(key + ".md")[0] != content_hash for key, content_hash in entry["embeds"].items())
+
+
+    def remove_stale(self, remove=os.remove):
+        """Deletes outputs whose source note is gone or was left out of this build, and copies of
+        attachments that aren't linked to anymore, with 'remove'. Returns their count."""
+        current_outputs = {entry["out_path"] for entry in self.entries.values()}
+        removed = 0
+        for key, old in self.old_entries.items():
+            out_path = old["out_path"]
+            if out_path in current_outputs or not os.path.isfile(out_path):
+                continue
+            remove(out_path)
+            removed += 1
+            LOG.debug("Removed stale output \"%s\" of \"%s\".", out_path, key)
+
+        # Attachments no note links to anymore
+        current_assets = set(self.assets)
+        for out_path in self.old_assets:
+            if out_path not in current_assets and os.path.isfile(out_path):
+                remove(out_path)
+                removed += 1
+
+        return removed
+
+
+    def save(self):
+        data = {"version": MANIFEST_VERSION, "fingerprint": self.fingerprint, "entries": self.entries, "assets": self.assets}
+        with open(self.path, "w", encoding="utf8") as f:
+            json.dump(data, f, separators=(",", ":"))
@@ -1,91 +1,116 @@
 import os
 import sys
-import regex as re
-from oboe.utils import slug_case, md_link, render_markdown, find_tags
-from oboe.format import (
-    format_tags, format_blockrefs, format_highlights, format_links, format_code_blocks
-)
-from oboe.Link import Link
-from oboe import LOG
+from oboe.utils import slug_case, find_tags
+from oboe.Renderer import render_markdown
+from oboe.format import convert_obsidian_syntax
+from oboe.Link import Link, links_in_text
+from oboe.Embeds import embedding
+from oboe.NoteIndex import note_key, read_note
 from oboe import GLOBAL
-import copy
+from oboe.profiling import profiled
 
 
 class Note:
+    # Only the metadata needed for the link graph is kept for the whole build. The content is
+    # read and converted when first needed, and released once the page is written.
+    __slots__ = ("path", "title", "out_path", "link", "targets", "missing", "attachments", "tags", "backlinks", "_content")
+
     def __init__(self, path):
         self.path = path
-        self.filename = os.path.split(path)[-1]
-        self.title = self.filename.replace(".md", "")
-        self.filename_html = slug_case(self.title) + ".html"
+        self.title = sys.intern(self.filename.replace(".md", ""))
         self.out_path = os.path.join(GLOBAL.OUTPUT_DIR, os.path.relpath(path, GLOBAL.VAULT_ROOT))
         self.out_path = os.path.join(os.path.split(self.out_path)[0], self.filename_html)
 
-        self.link = Link(self.title)
+        self.link = Link(self.title, target=note_key(path))
 
-        with open(path, encoding="utf8") as f:
-            self.content = f.read()
+        text = read_note(path)
 
-        self.backlink_html = ""
+        self.backlinks = []
 
-        self.links = self.links_in_file()
-        self.tags = find_tags(self.content)
+        # Only the targets of the links are kept. The Link objects are made again on conversion.
+        links = self.links_in_file(text)
+        self.targets = tuple(link.target for link in links)
+        self.missing = tuple(link.target for link in links if not link.resolved and link.attachment is None)
+        self.attachments = tuple(link.attachment for link in links if link.attachment is not None)
+        self.tags = tuple(sys.intern(tag) for tag in find_tags(text))
 
-        self.convert_obsidian_syntax()
+        self._content = None
 
-    def links_in_file(self):
-        """Returns a list of all links in the note."""
-        matches = re.finditer(r"(!)?\[{2}(.*?)\]{2}", self.content)
+    @property
+    def filename(self):
+        return os.path.split(self.path)[-1]
+
+    @property
+    def filename_html(self):
+        return slug_case(self.title) + ".html"
 
-        links = []
-        for match in matches:
-            link = Link(match.group(2), embed=match.group(1))
-            links.append(link)
+    @property
+    def content(self):
+        """The note converted into Markdown. Read from disk and converted on first use."""
+        if self._content is None:
+            self._content, _ = convert_note(self.path)
+        return self._content
 
-        return links
+    def release(self):
+        """Frees the content of the note. It is read again if needed later."""
+        self._content = None
 
-    def find_backlinks(self, others):
-        """Returns a list of Link objects linking to all the notes in 'others' that reference self"""
-        backlinks = []
-        for other in others:
-            if self == other: continue
-            if self.link in other.links:
-                backlinks.append(other.link)
+    def links_in_file(self, text):
+        """Returns a list of all links in the note."""
+        return links_in_text(text)
+
+    def find_backlinks(self, link_index):
+        """Returns a list of Link objects to all the notes that reference self, looked up in 'link_index'"""
+        backlinks = [other.link for other in link_index.get(self.link.target, ()) if other != self]
 
         backlinks = sorted(backlinks, key=lambda link: link.path)
 
         return backlinks
 
-    def convert_obsidian_syntax(self):
-        """Converts Obsidian syntax into Markdown."""
-        self.content = format_code_blocks(self.content)
-        self.content = format_links(self.content, self.links)
-        self.content = format_tags(self.content, self.tags)
-        self.content = format_blockrefs(self.content)
-        self.content = format_highlights(self.content)
+    def backlinks_markdown(self):
+        """Returns the backlinks of the note as Markdown, to be rendered as a block of its own."""
+        if not self.backlinks:
+            return ""
+
+        markdown = "\n<div class=\"backlinks\" markdown=\"1\">\n"
+        for backlink in self.backlinks:
+            if GLOBAL.BACKLINK_DASH == True: #If user disabled backlinkdash, then save it without the dash!
+                markdown += f"- {backlink.md_link()}\n"
+            else:
+                markdown += f"{backlink.md_link()}\n"
 
+        return markdown + "</div>"
+
+    @profiled("note.html", size=lambda self, pandoc=False: len(self.content.encode("utf8")), note=lambda self, pandoc=False: self.path)
     def html(self, pandoc=False):
-        """Returns the note formatted as HTML. Will use markdown2 as default, with the option of pandoc (WIP)"""
+        """Returns the note formatted as HTML, by the renderer set in GLOBAL.RENDERER, or by pandoc if 'pandoc' is set."""
+        return content_html(self.content, renderer="pandoc" if pandoc else None)
 
-        # LOG.debug(f"Converting {self.title} into HTML...")
+    def __eq__(self, other):
+        return self.path == other.path
 
-        if pandoc:
-            # Still WIP
-            import pypandoc
-            filters = ['pandoc-xnos']
-            args = []
-            html = pypandoc.convert_text(self.content, 'html', format='md', filters=filters, extra_args=args)
-        else:
-            html = render_markdown(self.content)
+    def __hash__(self):
+        return hash(self.path)
 
-        # Wrapping converted markdown in a div for styling
-        html = f"<div id=\"content\">{html}</div>"
 
 
+@profiled("note.convert_obsidian_syntax", note=lambda path: path)
+def convert_note(path):
+    """Reads the note at 'path' and converts it into Markdown. Returns that, and the keys of the
+    notes it embeds. Kept at module level so worker processes can run it."""
+    key = note_key(path)
+    text = read_note(path)
+    with embedding(key):
+        content = convert_obsidian_syntax(text, links_in_text(text))
+    return content, frozenset(GLOBAL.EMBEDS.dependencies[key]) if GLOBAL.EMBEDS is not None else frozenset()
 
-        # LOG.debug(f"{self.title} converted into HTML and placed inside div with id=\"content\"")
 
-        return html
+def content_html(content, renderer=None):
+    """Renders converted note content as HTML, with the renderer called 'renderer' or else the one
+    set in GLOBAL.RENDERER. Kept at module level so worker processes can run it."""
+    return wrap_content(render_markdown(content, renderer))
 
-    def __eq__(self, other):
-        return self.path == other.path
 
+def wrap_content(html):
+    # Wrapping converted markdown in a div for styling
+    return f"<div id=\"content\">{html}</div>"
@@ -0,0 +1,65 @@
+import os
+from oboe import GLOBAL
+
+
+def note_key(path):
+    """Vault relative path of a note without the .md extension, always with / as separator."""
+    key = os.path.relpath(path, GLOBAL.VAULT_ROOT).replace(os.sep, "/")
+    return key[:-3] if key.endswith(".md") else key
+
+
+def note_path(key):
+    """Path of the note with the key 'key'."""
+    return os.path.join(GLOBAL.VAULT_ROOT, *key.split("/")) + ".md"
+
+
+def read_note(path):
+    """Returns the text of the note at 'path', from the sources of the build if it has them."""
+    if GLOBAL.SOURCES is not None:
+        try:
+            return GLOBAL.SOURCES[os.path.relpath(path, GLOBAL.VAULT_ROOT).replace(os.sep, "/")]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+    with open(path, encoding="utf8") as f:
+        return f.read()
+
+
+class NoteIndex:
+    """Index of every note in the vault by name and path, built once from the discovered files.
+    Links are resolved against it like Obsidian does, without touching the filesystem."""
+
+    def __init__(self, paths):
+        # Both lookups are case insensitive, like links in Obsidian
+        self.by_key = {}
+        self.by_name = {}
+        for path in paths:
+            key = note_key(path)
+            self.by_key[key.casefold()] = key
+            self.by_name.setdefault(key.rsplit("/", 1)[-1].casefold(), []).append(key)
+
+        for keys in self.by_name.values():
+            # Shortest path first, so ambiguous names prefer the note closest to the vault root
+            keys.sort(key=lambda key: (key.count("/"), key))
+
+
+    def resolve(self, target):
+        """Returns the key of the note 'target' links to, or None if there is no such note. 'target'
+        is either a full path from the vault root, or the shortest path suffix that is unique."""
+        target = target.replace(os.sep, "/").strip("/")
+        if target.endswith(".md"):
+            target = target[:-3]
+        folded = target.casefold()
+
+        if folded in self.by_key:
+            return self.by_key[folded]
+
+        candidates = self.by_name.get(folded.rsplit("/", 1)[-1], ())
+        for key in candidates:
+            if key.casefold().endswith("/" + folded):
+                return key
+
+        return None
+
+
+    def __len__(self):
+        return len(self.by_key)
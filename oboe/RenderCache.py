@@ -0,0 +1,76 @@
+import json
+import time
+import zlib
+import hashlib
+from oboe.Renderer import get_renderer
+from oboe import LOG
+
+# Bump when render_markdown changes its output for the same input
+RENDER_CACHE_VERSION = 2
+
+# SQLite limits the number of parameters in a single statement
+BATCH_SIZE = 500
+
+
+class RenderCache:
+    """Persistent cache of rendered Markdown, addressed by a hash of the Markdown and the renderer
+    setup. Entries are compressed into a single SQLite file, evicting the least recently used ones
+    once it grows beyond 'max_bytes'."""
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Hits are marked as recently used in batches, when the cache is closed
+        self._used = []
+        self.salt = json.dumps([RENDER_CACHE_VERSION, get_renderer().salt()]).encode("utf8")
+
+        import sqlite3
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS renders (key BLOB PRIMARY KEY, html BLOB, size INTEGER, used INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS renders_used ON renders (used)")
+
+
+    def key(self, text):
+        return hashlib.sha1(self.salt + b"\0" + text.encode("utf8")).digest()
+
+
+    def get(self, key):
+        """Returns the rendered HTML stored under 'key', or None."""
+        row = self.db.execute("SELECT html FROM renders WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._used.append(key)
+        return zlib.decompress(row[0]).decode("utf8")
+
+
+    def put(self, key, html):
+        blob = zlib.compress(html.encode("utf8"))
+        self.db.execute("INSERT OR REPLACE INTO renders VALUES (?, ?, ?, ?)", (key, blob, len(blob), time.time_ns()))
+
+
+    def commit(self):
+        """Evicts the least recently used entries above the size cap, and writes the cache to disk."""
+        now = time.time_ns()
+        for i in range(0, len(self._used), BATCH_SIZE):
+            batch = self._used[i:i + BATCH_SIZE]
+            self.db.execute(f"UPDATE renders SET used = ? WHERE key IN ({','.join('?' * len(batch))})", [now, *batch])
+
+        evicted = self.db.execute(
+            "DELETE FROM renders WHERE key IN (SELECT key FROM "
+            "(SELECT key, SUM(size) OVER (ORDER BY used DESC, key) AS total FROM renders) WHERE total > ?)",
+            (self.max_bytes,)).rowcount
+        self.db.commit()
+        self._used = []
+
+        LOG.info(f"Render cache: {self.hits} hits, {self.misses} misses, {evicted} evicted.")
+        self.hits = self.misses = 0
+
+
+    def close(self):
+        self.commit()
+        self.db.close()
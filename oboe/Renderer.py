@@ -0,0 +1,232 @@
+import os
+import shutil
+import atexit
+import secrets
+import tempfile
+import subprocess
+import regex as re
+from oboe.utils import slug_case, MARKDOWN2_EXTRAS
+from oboe.patterns import HTML_TAG
+from oboe.profiling import profiled
+from oboe import GLOBAL
+
+
+class RendererError(Exception):
+    pass
+
+
+class Renderer:
+    """Turns Markdown into HTML. Backends that pay a fixed cost per call, like starting a process,
+    set 'batch_size' and override render_batch to convert many notes at once."""
+
+    name = None
+    batch_size = 1
+
+    def salt(self):
+        """Everything besides the Markdown that affects the HTML, for the render cache."""
+        raise NotImplementedError
+
+
+    def render(self, text):
+        return self.render_batch([text])[0]
+
+
+    def render_batch(self, texts):
+        return [self.render(text) for text in texts]
+
+
+class Markdown2Renderer(Renderer):
+    name = "markdown2"
+
+    def __init__(self):
+        # Imported with the renderer, as markdown2 alone takes longer to import than the rest of Oboe
+        import markdown2
+        self.markdown2 = markdown2
+
+
+    def salt(self):
+        return [self.name, self.markdown2.__version__, MARKDOWN2_EXTRAS]
+
+
+    def render(self, text):
+        # Escaped curly braces lose their escapes when formatted. I'm suspecting
+        # this is from markdown2, as I haven't found anyplace which could
+        # do this among my own formatter functions. Therefore I double escape them.
+        text = text.replace(r"\{", r"\\{").replace(r"\}", r"\\}")
+
+        return self.markdown2.markdown(text, extras=MARKDOWN2_EXTRAS)
+
+
+# Blocks of Markdown inside HTML, like the backlinks and embeds, which mistune would leave as they
+# are. Only blocks without others inside match, so nested embeds are rendered innermost first.
+MARKDOWN_IN_HTML = re.compile(r"^<div([^>]*?) markdown=\"1\">\n((?:(?!^<div[^>]*? markdown=\"1\">).)*?)\n</div>",
+                              re.MULTILINE | re.DOTALL)
+
+
+class MistuneRenderer(Renderer):
+    """mistune is several times faster than markdown2, set up to match its extras."""
+
+    name = "mistune"
+    plugins = ["strikethrough", "table", "footnotes", "task_lists"]
+
+    def __init__(self):
+        try:
+            import mistune
+        except ImportError:
+            raise RendererError("The mistune renderer needs mistune 3, install it with \"pip install mistune\"")
+
+        class HTMLRenderer(mistune.HTMLRenderer):
+            def heading(self, text, level, **attrs):
+                # Header IDs like markdown2's, needed for internal header links
+                return f"<h{level} id=\"{slug_case(HTML_TAG.sub('', text))}\">{text}</h{level}>\n"
+
+        self.version = mistune.__version__
+        self.markdown = mistune.create_markdown(hard_wrap=True, renderer=HTMLRenderer(escape=False),
+                                                plugins=self.plugins)
+
+
+    def salt(self):
+        return [self.name, self.version, self.plugins]
+
+
+    def render(self, text):
+        # The blocks are rendered first, and stand in the text as placeholder paragraphs, which
+        # are replaced by their HTML once the text around them is rendered
+        blocks = []
+        placeholder = f"oboe-block-{secrets.token_hex(8)}-"
+
+        def render_block(match):
+            html = self._restore(self.markdown(match.group(2)), placeholder, blocks)
+            blocks.append(f"<div{match.group(1)}>\n{html}</div>\n")
+            return f"\n\n{placeholder}{len(blocks) - 1}\n\n"
+
+        count = 1
+        while count:
+            text, count = MARKDOWN_IN_HTML.subn(render_block, text)
+        return self._restore(self.markdown(text), placeholder, blocks)
+
+
+    def _restore(self, html, placeholder, blocks):
+        if not blocks:
+            return html
+        return re.sub(rf"<p>{placeholder}(\d+)</p>\n?", lambda match: blocks[int(match.group(1))], html)
+
+
+# Custom pandoc reader, taking documents separated by the delimiter on the first line. Each one
+# is read and written on its own, so footnotes and header IDs don't run across documents.
+PANDOC_BATCH_READER = """
+local filters = {%s}
+
+-- pandoc writes divs starting with a heading as sections, taking the heading's ID, so those are
+-- written as raw divs instead, like the other renderers do
+local function keep_div(div)
+  if not div.content[1] or div.content[1].t ~= "Header" then return nil end
+  local tag = "<div"
+  if div.identifier ~= "" then tag = tag .. ' id="' .. div.identifier .. '"' end
+  if #div.classes > 0 then tag = tag .. ' class="' .. table.concat(div.classes, " ") .. '"' end
+  local blocks = pandoc.List({pandoc.RawBlock("html", tag .. ">")})
+  blocks:extend(div.content)
+  blocks:insert(pandoc.RawBlock("html", "</div>"))
+  return blocks
+end
+
+function Reader(input)
+  local delimiter, text = tostring(input):match("^([^\\n]*)\\n(.*)$")
+  local blocks = {}
+  local start = 1
+  while true do
+    local i, j = text:find(delimiter, start, true)
+    -- Line breaks are kept, like markdown2's break-on-newline, and images stay images instead of figures
+    local doc = pandoc.read(text:sub(start, (i or 0) - 1), "markdown+hard_line_breaks-implicit_figures")
+    for _, filter in ipairs(filters) do
+      doc = pandoc.utils.run_json_filter(doc, filter, {"html"})
+    end
+    doc = doc:walk({Div = keep_div})
+    table.insert(blocks, pandoc.RawBlock("html", pandoc.write(doc, "html", {wrap_text = "wrap-none"})))
+    if not i then break end
+    table.insert(blocks, pandoc.RawBlock("html", delimiter))
+    start = j + 1
+  end
+  return pandoc.Pandoc(blocks)
+end
+"""
+
+
+class PandocRenderer(Renderer):
+    """Converts a batch of notes per pandoc process, instead of starting pandoc for every note."""
+
+    name = "pandoc"
+    batch_size = 64
+
+    def __init__(self):
+        try:
+            import pypandoc
+            self.pandoc = pypandoc.get_pandoc_path()
+            self.version = pypandoc.get_pandoc_version()
+        except (ImportError, OSError):
+            raise RendererError("The pandoc renderer needs pandoc and pypandoc, see https://pypi.org/project/pypandoc")
+
+        # Filters are applied when installed
+        self.filters = [name for name in ["pandoc-xnos"] if shutil.which(name)]
+
+        # pandoc reads the reader from a file. It is written into a folder only this user can
+        # open, so nobody else can swap in a reader of their own. Worker processes forked from
+        # this one use the same file, and the process that wrote it removes it on exit.
+        folder = tempfile.mkdtemp(prefix="oboe-pandoc-")
+        self.reader = os.path.join(folder, "reader.lua")
+        with open(self.reader, "w", encoding="utf8") as f:
+            f.write(PANDOC_BATCH_READER % ", ".join(f"\"{name}\"" for name in self.filters))
+        atexit.register(_remove_reader, folder, os.getpid())
+
+
+    def salt(self):
+        return [self.name, self.version, self.filters]
+
+
+    def render_batch(self, texts):
+        # Random, so no note can contain it
+        delimiter = f"<!-- oboe-{secrets.token_hex(8)} -->"
+        source = delimiter + "\n" + f"\n{delimiter}\n".join(texts)
+
+        result = subprocess.run([self.pandoc, "--from", self.reader, "--to", "html"],
+                                input=source.encode("utf8"), capture_output=True)
+        if result.returncode != 0:
+            raise RendererError(f"pandoc failed: {result.stderr.decode('utf8', 'replace').strip()}")
+
+        return [html.strip("\n") + "\n" for html in result.stdout.decode("utf8").split(delimiter)]
+
+
+def _remove_reader(folder, pid):
+    # Processes forked from the one that wrote the reader inherit its exit handlers
+    if os.getpid() == pid:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+RENDERERS = {renderer.name: renderer for renderer in (Markdown2Renderer, MistuneRenderer, PandocRenderer)}
+
+# One instance of each backend per process
+_renderers = {}
+
+
+def get_renderer(name=None):
+    """Returns the renderer called 'name', by default the one chosen in GLOBAL.RENDERER. Raises a
+    RendererError if it doesn't exist or isn't installed."""
+    name = name or GLOBAL.RENDERER
+    renderer = _renderers.get(name)
+    if renderer is None:
+        if name not in RENDERERS:
+            raise RendererError(f"Unknown renderer \"{name}\", choose from {', '.join(RENDERERS)}")
+        renderer = _renderers[name] = RENDERERS[name]()
+
+    return renderer
+
+
+@profiled("render_markdown", size=lambda text, renderer=None: len(text.encode("utf8")))
+def render_markdown(text, renderer=None):
+    return get_renderer(renderer).render(text)
+
+
+@profiled("render_markdown", size=lambda texts: sum(len(text.encode("utf8")) for text in texts))
+def render_markdown_batch(texts):
+    """Renders a list of Markdown strings. Kept at module level so worker processes can run it."""
+    return get_renderer().render_batch(texts)
@@ -0,0 +1,160 @@
+import os
+import json
+import regex as re
+from oboe.profiling import profiled
+from oboe import LOG
+from oboe import GLOBAL
+
+SEARCH_DIR = "search"
+DOCS_FILENAME = "docs.json"
+SEARCH_INDEX_VERSION = 1
+
+# Terms are sharded by their first characters, so a query only fetches the shards of its terms
+SHARD_PREFIX = 2
+
+# Weight of a term in the title or tags of a note, relative to once in its text
+TITLE_WEIGHT = 5
+TAG_WEIGHT = 3
+
+TERM = re.compile(r"[\p{L}\p{N}_]{2,32}")
+# Markup in the converted text that isn't worth searching: HTML tags and link destinations
+MARKUP = re.compile(r"<[^>]*>|\]\([^)]*\)")
+
+
+def terms(text):
+    return [term.casefold() for term in TERM.findall(MARKUP.sub(" ", text))]
+
+
+def shard_name(term):
+    return term[:SHARD_PREFIX]
+
+
+class SearchIndex:
+    """Inverted index from each term to the notes containing it, with a weight per note, written
+    as JSON shards for client-side search.
+
+    search/docs.json lists the notes, by the keys of the link graph, and the shards that exist.
+    A note's position in that list is its id. Each search/<prefix>.json maps the terms starting
+    with <prefix> to [id, weight] pairs, heaviest first."""
+
+    def __init__(self, output_dir):
+        self.dir = os.path.join(output_dir, SEARCH_DIR)
+        # Per id: [key, title, url], or None for removed notes whose id is free again
+        self.docs = []
+        self.ids = {}
+        self.postings = {}
+        self.shards = set()
+        self._free = []
+        # Notes added again since the last save, whose old postings still need removing
+        self._stale = set()
+        self._fresh = {}
+
+
+    def load(self):
+        """Loads the index written by the previous build, so only changed notes need adding."""
+        try:
+            with open(os.path.join(self.dir, DOCS_FILENAME), encoding="utf8") as f:
+                data = json.load(f)
+            if data.get("version") != SEARCH_INDEX_VERSION:
+                return
+            docs = data["docs"]
+            for shard in data["shards"]:
+                with open(os.path.join(self.dir, f"{shard}.json"), encoding="utf8") as f:
+                    for term, postings in json.load(f).items():
+                        self.postings[term] = dict(postings)
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError, TypeError):
+            LOG.warning("Search index is corrupt, indexing all notes again.")
+            self.postings = {}
+            return
+
+        self.docs = docs
+        self.ids = {doc[0]: i for i, doc in enumerate(docs) if doc is not None}
+        self._free = [i for i, doc in enumerate(docs) if doc is None]
+        self.shards = set(data["shards"])
+
+
+    @profiled("search.index", size=lambda self, note, content: len(content.encode("utf8")), note=lambda self, note, content: note.path)
+    def add(self, note, content):
+        """Indexes 'note', with 'content' its converted text, replacing what was indexed for it before."""
+        key = note.link.target
+        id = self.ids.get(key)
+        if id is None:
+            id = self.ids[key] = self._free_id()
+        else:
+            self._stale.add(id)
+
+        url = os.path.relpath(note.out_path, GLOBAL.OUTPUT_DIR).replace(os.sep, "/")
+        if not GLOBAL.HTML_LINK_EXTENSIONS:
+            url = url[:-len(".html")]
+        self.docs[id] = [key, note.title, url]
+
+        weights = {}
+        for term in terms(content):
+            weights[term] = weights.get(term, 0) + 1
+        for term in terms(note.title):
+            weights[term] = weights.get(term, 0) + TITLE_WEIGHT
+        for tag in note.tags:
+            for term in terms(tag):
+                weights[term] = weights.get(term, 0) + TAG_WEIGHT
+        self._fresh[id] = weights
+
+
+    def _free_id(self):
+        if self._free:
+            return self._free.pop()
+        self.docs.append(None)
+        return len(self.docs) - 1
+
+
+    def retain(self, keys):
+        """Removes every note whose key is not in 'keys'."""
+        keys = set(keys)
+        for key in [key for key in self.ids if key not in keys]:
+            id = self.ids.pop(key)
+            self.docs[id] = None
+            self._free.append(id)
+            self._stale.add(id)
+            self._fresh.pop(id, None)
+
+
+    def _merge(self):
+        # Old postings of re-added and removed notes are dropped in one pass over the index
+        if self._stale:
+            for term in list(self.postings):
+                postings = self.postings[term]
+                for id in self._stale.intersection(postings):
+                    del postings[id]
+                if not postings:
+                    del self.postings[term]
+
+        for id, weights in self._fresh.items():
+            for term, weight in weights.items():
+                self.postings.setdefault(term, {})[id] = weight
+
+        self._stale = set()
+        self._fresh = {}
+
+
+    def save(self, writer):
+        """Writes the shards and the list of notes with 'writer', which leaves unchanged shards as they are."""
+        self._merge()
+        os.makedirs(self.dir, exist_ok=True)
+
+        shards = {}
+        for term in sorted(self.postings):
+            postings = sorted(self.postings[term].items(), key=lambda posting: (-posting[1], posting[0]))
+            shards.setdefault(shard_name(term), {})[term] = postings
+
+        for shard, index in shards.items():
+            writer.write(json.dumps(index, ensure_ascii=False, separators=(",", ":")),
+                         os.path.join(self.dir, f"{shard}.json"))
+        for shard in self.shards - shards.keys():
+            writer.delete(os.path.join(self.dir, f"{shard}.json"))
+        self.shards = set(shards)
+
+        data = {"version": SEARCH_INDEX_VERSION, "shard_prefix": SHARD_PREFIX, "docs": self.docs, "shards": sorted(shards)}
+        writer.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")), os.path.join(self.dir, DOCS_FILENAME))
+
+        LOG.info(f"Indexed {len(self.ids)} notes for search, {len(self.postings)} terms in {len(shards)} shards.")
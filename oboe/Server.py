@@ -0,0 +1,237 @@
+import os
+import threading
+import mimetypes
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlsplit
+from oboe.Renderer import render_markdown
+from oboe.Note import content_html
+from oboe.NoteIndex import note_path
+from oboe import LOG
+from oboe import GLOBAL
+from oboe.config import uses_config
+
+
+class PageCache:
+    """Rendered pages by URL path, evicting the least recently used ones once their total size
+    grows beyond 'max_bytes'. Each page is kept with the mtime of its note, or of every note it
+    shows, so it is rendered again once one of those changes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key, mtime, count=True):
+        with self._lock:
+            entry = self._pages.get(key)
+            hit = entry is not None and entry[0] == mtime
+            if count:
+                self.hits += hit
+                self.misses += not hit
+            if not hit:
+                return None
+            self._pages.move_to_end(key)
+            return entry[1]
+
+
+    def put(self, key, mtime, page):
+        with self._lock:
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            # Pages larger than the whole cache are served, but not kept
+            if len(page) > self.max_bytes:
+                return
+            self._pages[key] = (mtime, page)
+            self.size += len(page)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._pages.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class Server:
+    """Serves a vault over HTTP, rendering each page when it is first requested instead of
+    exporting the whole vault. The URLs are those of the exported vault.
+
+    The notes and their backlinks are indexed once, at startup. Edits to a note show up on the
+    next request for its page, but links added or removed by the edit only show up in backlinks
+    after a restart. Pages are also rendered again when a note they embed changes."""
+
+    def __init__(self, vault, host="127.0.0.1", port=8000, cache_size=64, threads=8):
+        self.vault = vault
+        # Requests are handled in threads of their own, which use the vault's config
+        self.config = vault.config
+        self.vault.compile_template()
+        # Stylesheets and attachments by their path relative to the output directory
+        self.assets = {os.path.relpath(out_path, self.config.OUTPUT_DIR).replace(os.sep, "/"): source
+                       for out_path, source in self.vault.collect_assets().files.items()}
+        self.cache = PageCache(cache_size * 1024 * 1024)
+        self.threads = threads
+
+        # Pages are found by their path relative to the output directory, with or without .html
+        self.pages = {}
+        for note in vault.notes:
+            page = os.path.relpath(note.out_path, self.config.OUTPUT_DIR).replace(os.sep, "/")
+            self.pages[page] = note
+            self.pages[page[:-len(".html")]] = note
+        # Renders of the same page wait for each other, which also keeps a note's content to one thread
+        self._render_locks = {note.path: threading.Lock() for note in vault.notes}
+        # Embeds are resolved from state shared by every page, so notes are converted one at a time
+        self._convert_lock = threading.Lock()
+        self._mtimes = {}
+
+        self.httpd = _PooledHTTPServer((host, port), _Handler, threads)
+        self.httpd.oboe = self
+
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+
+    @uses_config
+    def page(self, path):
+        """Returns the body and content type for the URL 'path', or None if there is nothing there."""
+        path = path.strip("/") or "index"
+        note = self.pages.get(path)
+        if note is None:
+            return self.asset(path)
+
+        try:
+            mtime = self.mtimes(note)
+        except FileNotFoundError:
+            return None
+
+        page = self.cache.get(path, mtime)
+        if page is None:
+            with self._render_locks[note.path]:
+                # Another thread may have rendered it while this one waited
+                page = self.cache.get(path, mtime, count=False)
+                if page is None:
+                    page = self.render(note).encode("utf8")
+                    self.cache.put(path, mtime, page)
+
+        return page, "text/html; charset=utf-8"
+
+
+    def mtimes(self, note):
+        """Returns the mtimes of 'note' and of the notes it embeds. Embeds extracted from notes
+        that changed since they were last seen are forgotten."""
+        own = note.link.target
+        mtimes = [os.stat(note.path).st_mtime_ns]
+        for key in [own, *sorted(GLOBAL.EMBEDS.dependencies.get(own, set()) - {own})]:
+            mtime = mtimes[0] if key == own else embed_mtime(key)
+            if self._mtimes.get(key, mtime) != mtime:
+                with self._convert_lock:
+                    GLOBAL.EMBEDS.invalidate([key])
+                self._mtimes[key] = mtime
+            if key != own:
+                mtimes.append(mtime)
+
+        return tuple(mtimes)
+
+
+    def render(self, note):
+        LOG.debug("Rendering %s...", note.title)
+        with self._convert_lock:
+            markdown = note.content
+            # What was embedded is as recent as these, until they change
+            for key in GLOBAL.EMBEDS.dependencies.get(note.link.target, ()):
+                self._mtimes.setdefault(key, embed_mtime(key))
+        content = content_html(markdown)
+        # Read again on the next render, which is when the note has changed
+        note.release()
+        backlinks = render_markdown(note.backlinks_markdown()) if note.backlinks else ""
+        return self.vault.template.render(os.path.dirname(note.out_path),
+                                          title=note.title, content=content, backlinks=backlinks)
+
+
+    def asset(self, path):
+        """Returns a stylesheet referenced by the template or an attachment, which the export would have copied."""
+        source = self.assets.get(path)
+        if source is None:
+            return None
+        try:
+            with open(source, "rb") as f:
+                return f.read(), mimetypes.guess_type(source)[0] or "application/octet-stream"
+        except FileNotFoundError:
+            return None
+
+
+    @uses_config
+    def run(self):
+        # Serving runs until stopped, so messages are written as they come instead of buffered
+        LOG.set_buffered(False)
+        LOG.info(f"Serving \"{os.path.abspath(GLOBAL.VAULT_ROOT)}\" at {self.url} Press Ctrl+C to stop.")
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            LOG.info(f"Stopped serving. Page cache: {self.cache.hits} hits, {self.cache.misses} misses.")
+        finally:
+            self.httpd.server_close()
+
+
+def embed_mtime(key):
+    try:
+        return os.stat(note_path(key)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class _PooledHTTPServer(HTTPServer):
+    """HTTP server that handles requests in a fixed pool of threads."""
+
+    def __init__(self, address, handler, threads):
+        super().__init__(address, handler)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="oboe-serve")
+
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process, request, client_address)
+
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Connections close after each response, as kept-alive ones would each hold on to a thread of the pool
+
+    def do_GET(self, head=False):
+        found = self.server.oboe.page(unquote(urlsplit(self.path).path))
+        if found is None:
+            body, content_type, status = b"Not found\n", "text/plain; charset=utf-8", 404
+        else:
+            (body, content_type), status = found, 200
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+
+    def log_message(self, format, *args):
+        LOG.debug("%s - %s", self.address_string(), format % args)
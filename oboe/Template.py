@@ -0,0 +1,95 @@
+import os
+import regex as re
+from oboe import GLOBAL
+
+FIELDS = ("title", "content", "backlinks")
+
+# Kinds of segments a compiled template consists of
+LITERAL, FIELD, ASSET = range(3)
+
+# Stands for the path from a page to the root of the output in its fields, like in the URLs of
+# attachments, so they can be converted and rendered once for pages in any folder
+SITE_ROOT = "_oboe_root_/"
+
+
+class Template:
+    """An HTML template compiled into literal, field and asset segments, so each page is assembled
+    with a single join. Only {title}, {content} and {backlinks} are fields, any other curly brace
+    is kept as is. With 'format_escapes', for templates written for str.format as older versions
+    of Oboe required, double braces are turned into single ones."""
+
+    def __init__(self, text, assets=(), format_escapes=False):
+        self.text = text
+        self.format_escapes = format_escapes
+        # Local files referenced by href="...", which need a relative path from each page
+        self.assets = sorted(set(assets), key=len, reverse=True)
+        self.segments = self._compile(text)
+        self._asset_hrefs = {}
+
+
+    def _compile(self, text):
+        # Double braces only need unescaping in templates written for str.format
+        escapes = r"\{\{|\}\}" if self.format_escapes else r"(?!)"
+        pattern = "(" + escapes + r")|\{(" + "|".join(FIELDS) + r")\}"
+        if self.assets:
+            pattern += r"|href=\"(" + "|".join(re.escape(asset) for asset in self.assets) + r")\""
+
+        segments = []
+        literal = []
+        pos = 0
+        for match in re.finditer(pattern, text):
+            literal.append(text[pos:match.start()])
+            pos = match.end()
+
+            if match.group(1):
+                literal.append(match.group(1)[0])
+                continue
+
+            segments.append((LITERAL, "".join(literal)))
+            literal = []
+            if match.group(2):
+                segments.append((FIELD, match.group(2)))
+            else:
+                segments.append((ASSET, match.group(3)))
+
+        literal.append(text[pos:])
+        segments.append((LITERAL, "".join(literal)))
+
+        return [(kind, value) for kind, value in segments if kind != LITERAL or value]
+
+
+    def asset_hrefs(self, out_dir):
+        """Returns the href attributes of all assets for pages in 'out_dir', computed once per directory."""
+        hrefs = self._asset_hrefs.get(out_dir)
+        if hrefs is None:
+            relative_root = self.relative_root(out_dir)
+            hrefs = {asset: f"href=\"{os.path.join(relative_root, asset)}\"" for asset in self.assets}
+            self._asset_hrefs[out_dir] = hrefs
+
+        return hrefs
+
+
+    def relative_root(self, out_dir):
+        """Path from pages in 'out_dir' to the root of the output directory, like "../..", or "."."""
+        return os.path.relpath(GLOBAL.OUTPUT_DIR, out_dir).replace(os.sep, "/")
+
+
+    def render(self, out_dir, **fields):
+        """Assembles a page placed in 'out_dir' from the template, filling in 'fields'."""
+        hrefs = self.asset_hrefs(out_dir) if self.assets else None
+        root = None
+
+        parts = []
+        for kind, value in self.segments:
+            if kind == LITERAL:
+                parts.append(value)
+            elif kind == FIELD:
+                field = fields.get(value, "")
+                if SITE_ROOT in field:
+                    root = root or self.relative_root(out_dir) + "/"
+                    field = field.replace(SITE_ROOT, root)
+                parts.append(field)
+            else:
+                parts.append(hrefs[value])
+
+        return "".join(parts)
@@ -1,149 +1,506 @@
 import os
 import sys
-import regex as re
-from oboe.utils import slug_case, md_link, render_markdown, write, find_subdirs_recursively
-from oboe.Note import Note
+from collections import deque
+from itertools import islice
+from oboe.patterns import STYLESHEET
+from oboe.Note import Note, wrap_content, convert_note
+from oboe.Manifest import Manifest
+from oboe.NoteIndex import NoteIndex, note_key
+from oboe.Embeds import Embeds
+from oboe.RenderCache import RenderCache
+from oboe.Renderer import get_renderer, render_markdown_batch, RendererError
+from oboe.Template import Template
+from oboe.Writer import Writer
+from oboe.Assets import Assets
+from oboe.SearchIndex import SearchIndex
+from oboe.discovery import load_rules, scan
+from oboe.partition import partition_of, merge_links, write_links, PartitionError
+from oboe.parallel import pool_map, resolve_jobs, worker_pool
+from oboe.profiling import profiled, PROFILER
+from oboe.tagfilter import parse_filter, tag_index, evaluate, members, describe, scan_tags, FilterError
 from oboe import LOG
 from oboe import GLOBAL
+from oboe.config import current, uses_config
 
+# Used when no template is given
+BARE_TEMPLATE = "{content}\n{backlinks}"
 
 class Vault:
-    def __init__(self, extra_folders=[], html_template=None, filter_list=[]):
-        self.extra_folders = extra_folders
-        # If extra_folders = [], then scan all subdirectories recursively
-        if type(extra_folders) == list and not extra_folders:
-            LOG.debug("Adding notes from all subdirectories recursively.")
-            self.extra_folders = find_subdirs_recursively(GLOBAL.VAULT_ROOT)
-
-        self.notes = self._find_files()
-
-        include_filter = []; exclude_filter = []
-        for elem in filter_list:
-            if elem[0] == ".":
-                exclude_filter.append(elem[1:])
-            else:
-                include_filter.append(elem)
-
-        # Filters out all notes that contain a tag in the exclude filter
-        self.notes = list(filter(lambda x: not set(exclude_filter).intersection(set(x.tags)), self.notes))
-        LOG.info(f"Filtered out notes containing tags: {exclude_filter}")
-        # If include filter is present, filters out any notes NOT containing a tag in include filter
-        if include_filter:
-            self.notes = list(filter(lambda x: set(include_filter).intersection(set(x.tags)), self.notes))
-            LOG.info(f"Filtered out notes NOT containing tags: {include_filter}")
+    """The notes of a vault, with their links, ready to be exported. Settings come from 'config',
+    or from the config active when the vault is created, like the one the command line sets up.
+    'template' is the text of a template, used instead of reading 'html_template'. With
+    'legacy_template', its double curly braces are escapes, as older versions of Oboe required.
 
-        self._add_backlinks()
+    With 'partition', an (i, N) pair, only the i-th of N partitions of the notes is exported, so N
+    machines can share a build. The notes of the other partitions are parsed for their links, or
+    taken from the link metadata in the files 'links' when given."""
 
-        if html_template:
-            self.html_template_path = os.path.abspath(html_template)
+    def __init__(self, extra_folders=[], html_template=None, filter_list=[], incremental=False, jobs=1,
+                 render_cache=None, render_cache_size=512, precompress=(), search=False, config=None, template=None,
+                 link_assets=False, exclude=(), partition=None, links=None, legacy_template=False):
+        self.config = config if config is not None else current()
+        # Everything the vault does runs with its own config active, so GLOBAL refers to it
+        with self.config.active():
+            self.extra_folders = extra_folders
+            # Compression formats of the siblings written next to every page, like "gzip"
+            self.precompress = list(precompress)
+            self.search = search
+            self.search_index = None
+            # Hardlink stylesheets and attachments into the output, instead of copying them
+            self.link_assets = link_assets
+            self.manifest = None
+            self.filter_list = filter_list
+            self.incremental = incremental
+            self.jobs = resolve_jobs(jobs)
             try:
-                with open(html_template, "r", encoding="utf8") as f:
-                    self.html_template = f.read()
-                LOG.debug(f"Using template: \"{os.path.abspath(self.html_template_path)}\"")
-            except FileNotFoundError:
-                LOG.error(f"Cannot find a template at path \"{self.html_template_path}\", aborting.")
+                self.renderer = get_renderer()
+            except RendererError as e:
+                LOG.error(f"{e}, aborting.")
                 sys.exit()
+            # Rendered Markdown is cached across builds when given a cache file
+            self.render_cache = RenderCache(render_cache, render_cache_size * 1024 * 1024) if render_cache else None
+            # If extra_folders = [], then scan all subdirectories recursively
+            self.recursive = type(extra_folders) == list and not extra_folders
+            # Files left out of the vault, by .oboeignore, Obsidian's excluded files and 'exclude'
+            self.ignore = load_rules(GLOBAL.VAULT_ROOT, exclude) if GLOBAL.SOURCES is None else None
+            self.partition = partition
+            self.legacy_template = legacy_template
+            self.links = links
+            # Notes of the other partitions, only used for the backlinks of this one
+            self.others = []
 
-        LOG.info(f"Created Vault object with root \"{os.path.abspath(GLOBAL.VAULT_ROOT)}\"")
+            self.notes = self._find_files(filter_list)
 
+            self._add_backlinks()
 
-    def _add_backlinks(self):
-        for i, note in enumerate(self.notes):
-            # Make temporary list of all notes except current note in loop
-            others = [other for other in self.notes if other != note]
-            backlinks = note.find_backlinks(others)
-            if backlinks:
-                self.notes[i].backlink_html += "\n<div class=\"backlinks\" markdown=\"1\">\n"
-                for backlink in backlinks:
-                    if GLOBAL.BACKLINK_DASH == True: #If user disabled backlinkdash, then save it without the dash!
-                        self.notes[i].backlink_html += f"- {backlink.md_link()}\n"
-                    else:
-                        self.notes[i].backlink_html += f"{backlink.md_link()}\n"
+            if template is not None:
+                self.html_template = template
+            elif html_template:
+                self.html_template_path = os.path.abspath(html_template)
+                try:
+                    with open(html_template, "r", encoding="utf8") as f:
+                        self.html_template = f.read()
+                    LOG.debug("Using template: \"%s\"", self.html_template_path)
+                except FileNotFoundError:
+                    LOG.error(f"Cannot find a template at path \"{self.html_template_path}\", aborting.")
+                    sys.exit()
+
+            LOG.info(f"Created Vault object with root \"{os.path.abspath(GLOBAL.VAULT_ROOT)}\"")
+
+
+    def _build_link_index(self):
+        """Maps each link target path to the set of notes linking to it, in one pass over all links."""
+        self.link_index = {}
+        for note in self.notes + self.others:
+            for target in note.targets:
+                self.link_index.setdefault(target, set()).add(note)
+
+        self._find_orphans_and_missing()
+
+
+    def _find_orphans_and_missing(self):
+        # Notes nobody links to are orphans, links the note index could not resolve are missing
+        self.orphans = [note for note in self.notes if not self.link_index.get(note.link.target, set()) - {note}]
+        self.missing_links = sorted({target for note in self.notes for target in note.missing})
 
-                self.notes[i].backlink_html += "</div>"
+        LOG.debug("Indexed %d link targets, %d orphans, %d missing notes.",
+                  len(self.link_index), len(self.orphans), len(self.missing_links))
 
-                self.notes[i].backlink_html = render_markdown(self.notes[i].backlink_html)
+
+    @profiled("vault.backlinks")
+    def _add_backlinks(self):
+        self._build_link_index()
+
+        # Only the sources are looked up here. The blocks are rendered as each page is exported.
+        for note in self.notes:
+            note.backlinks = note.find_backlinks(self.link_index)
 
 
+    @profiled("vault.export_html")
+    @uses_config
     def export_html(self):
-        # Ensure the output directory exists, as well as all extra folders.
-        if not os.path.exists(GLOBAL.OUTPUT_DIR):
-            os.makedirs(GLOBAL.OUTPUT_DIR)
-        if self.extra_folders:
-            for folder in self.extra_folders:
-                out_folder = os.path.join(GLOBAL.OUTPUT_DIR, os.path.relpath(folder, GLOBAL.VAULT_ROOT))
-                if not os.path.exists(out_folder):
-                    os.makedirs(out_folder)
+        # One pool serves every stage, and its workers start before the writer's threads do
+        with worker_pool(self.jobs) as pool, Writer(precompress=self.precompress) as writer:
+            self._prepare_output(writer)
+            notes = self._notes_to_render()
+            if self.incremental:
+                self.manifest.assets = sorted(self.assets.files)
+            if self.search:
+                self.search_index = SearchIndex(GLOBAL.OUTPUT_DIR)
+                if self.incremental:
+                    # Notes that didn't change keep what the last build indexed
+                    self.search_index.load()
+            self._write_pages(notes, writer, pool=pool)
+            if self.incremental:
+                self.manifest.remove_stale(writer.delete)
+            if self.search_index:
+                self.search_index.retain(note.link.target for note in self.notes)
+                self.search_index.save(writer)
+
+        # Reported once all pages are written, instead of once per link
+        if self.missing_links:
+            LOG.warning(f"{len(self.missing_links)} links point to missing notes: {self.missing_links}")
+
+        if self.render_cache:
+            self.render_cache.commit()
+
+        if self.incremental:
+            self.manifest.save()
+            LOG.info(f"Rendered {len(notes)} of {len(self.notes)} notes.")
+        LOG.info(writer.summary())
+
+
+    def _prepare_output(self, writer):
+        """Creates the output directories, compiles the template and copies local stylesheets."""
+        # Ensure the output directory exists, as well as the folder of every page
+        os.makedirs(GLOBAL.OUTPUT_DIR, exist_ok=True)
+        for folder in {os.path.dirname(note.out_path) for note in self.notes}:
+            os.makedirs(folder, exist_ok=True)
+
+        self.compile_template()
+        self.assets = self.collect_assets()
+        if self.assets:
+            LOG.info(f"Copying {len(self.assets)} stylesheets and attachments to the output directory...")
+            self.assets.copy(writer)
 
+
+    @uses_config
+    def collect_assets(self):
+        """Returns the Assets, the local stylesheets of the template and the attachments the notes
+        link to, by their path in the output directory. Expects the template to be compiled."""
+        assets = Assets(link=self.link_assets)
+        for stylesheet, stylesheet_abspath in self.stylesheets.items():
+            assets.add(stylesheet_abspath, os.path.join(GLOBAL.OUTPUT_DIR, stylesheet))
+        for key in sorted({key for note in self.notes for key in note.attachments}):
+            assets.add(os.path.join(GLOBAL.VAULT_ROOT, *key.split("/")), os.path.join(GLOBAL.OUTPUT_DIR, *key.split("/")))
+        return assets
+
+
+    @uses_config
+    def compile_template(self):
+        """Compiles the template, and finds the local stylesheets it references. Those are mapped
+        from their href to their path in 'self.stylesheets'."""
+        self.stylesheets = {}
         if hasattr(self, "html_template"):
-            stylesheets = re.findall('<link+.*rel="stylesheet"+.*href="(.+?)"', self.html_template)
+            # Templates given as text have no folder to find stylesheets in
+            stylesheets = STYLESHEET.findall(self.html_template) \
+                if hasattr(self, "html_template_path") else []
             for stylesheet in stylesheets:
                 # Check if template contains reference to a stylesheet
                 stylesheet_abspath = os.path.join(os.path.dirname(self.html_template_path), stylesheet)
-                # Check if the referenced stylesheet is local, and copy it to the output directory if it is
+                # Check if the referenced stylesheet is local, so it has to be copied to the output directory
                 if os.path.isfile(stylesheet_abspath):
-                    GLOBAL.STYLESHEETS.append(stylesheet)
-                    LOG.info("Copying stylesheet to the output directory...")
+                    self.stylesheets[stylesheet] = stylesheet_abspath
 
-                    with open(stylesheet_abspath, encoding="utf-8") as f:
-                        stylesheet_content = f.read()
-                    write(stylesheet_content, os.path.join(GLOBAL.OUTPUT_DIR, stylesheet))
+            # Compiled once, with the local stylesheets as assets that get paths relative to each page
+            self.template = Template(self.html_template, self.stylesheets, format_escapes=self.legacy_template)
+        else:
+            # Do not use a template, just output the content and a list of backlinks
+            self.template = Template(BARE_TEMPLATE)
 
-                    LOG.info("Copied local stylesheet into the output directory.")
 
-            # Use the supplied template on all notes
-            for note in self.notes:
-                LOG.debug(f"Formatting {note.title} according to the supplied HTML template...")
+    @profiled("vault.build")
+    @uses_config
+    def build(self, sink=None):
+        """Renders every page without writing anything to disk. Returns the pages as a dict from
+        their path relative to the output directory, like "sub/note.html", to their HTML. With a
+        'sink', each page is passed to sink(path, html) as soon as it is rendered instead, and
+        nothing is returned."""
+        self.compile_template()
+        pages = {}
+        with worker_pool(self.jobs) as pool:
+            for note, html in self._pages(self.notes, self.template, pool=pool):
+                path = os.path.relpath(note.out_path, GLOBAL.OUTPUT_DIR).replace(os.sep, "/")
+                if sink is None:
+                    pages[path] = html
+                else:
+                    sink(path, html)
 
-                html = self.html_template.format(title=note.title, content=note.html(), backlinks=note.backlink_html)
-                # If we have copied stylesheet, make sure the paths are correct for each subdirectory
-                for stylesheet in GLOBAL.STYLESHEETS:
-                    relative_path = os.path.join(os.path.relpath(GLOBAL.OUTPUT_DIR, os.path.dirname(note.out_path)), stylesheet)
-                    html = html.replace(f"href=\"{stylesheet}\"", f"href=\"{relative_path}\"")
+        if self.missing_links:
+            LOG.warning(f"{len(self.missing_links)} links point to missing notes: {self.missing_links}")
+        if self.render_cache:
+            self.render_cache.commit()
 
-                write(html, note.out_path)
+        return pages if sink is None else None
 
-                LOG.debug(f"{note.title} written.")
-        else:
-            # Do not use a template, just output the content and a list of backlinks
-            for note in self.notes:
-                LOG.debug(f"Exporting {note.title} without using a template.")
 
-                html = "{content}\n{backlinks}".format(content=note.html(), backlinks=note.backlink_html)
-                write(html, note.out_path)
+    def _write_pages(self, notes, writer, jobs=None, pool=None):
+        for note, html in self._pages(notes, self.template, jobs, pool):
+            writer.write(html, note.out_path)
+            LOG.debug("%s written.", note.title)
 
-                LOG.debug(f"{note.title} written.")
 
+    @uses_config
+    def update(self, changed=(), removed=()):
+        """Brings an exported vault up to date after the notes at the paths in 'changed' were added
+        or modified, and those in 'removed' deleted. Only those notes, and the notes whose backlinks
+        changed, are rendered again. Returns the number of pages that changed on disk. Expects export_html to
+        have run first.
 
-    def _find_files(self):
-        # Find all markdown-files in vault root.
-        md_files = self._find_files_in_dir(GLOBAL.VAULT_ROOT)
-        # Find all markdown-files.
-        if self.extra_folders:
-            for folder in self.extra_folders:
-                md_files += self._find_files_in_dir(folder, is_extra_dir=True)
+        A handful of notes is handled faster in this process than by starting worker processes,
+        so no process pool is used here."""
+        notes = {note.path: note for note in self.notes}
+        old_paths = set(self.md_paths)
+        removed = set(removed) & old_paths
+        added = set(changed) - old_paths
+        reparse = set(changed)
 
-        LOG.info(f"Found {len(md_files)} notes!")
-        return md_files
+        if added or removed:
+            self.md_paths = [path for path in self.md_paths if path not in removed] + sorted(added)
+            GLOBAL.NOTE_INDEX = NoteIndex(self.md_paths)
+            # Links are resolved by name, so links to a name of a deleted or added note may now
+            # resolve differently: to another note, to the added one instead of one further from
+            # the root, or to nothing
+            names = {note_key(path).rsplit("/", 1)[-1].casefold() for path in added | removed}
+            for note in notes.values():
+                if any(target.rsplit("/", 1)[-1].casefold() in names for target in note.targets):
+                    reparse.add(note.path)
 
+        # Pages embedding the changed notes, directly or through other embeds, show them as well
+        embedding = set(GLOBAL.EMBEDS.invalidate(map(note_key, set(changed) | removed)))
 
-    def _find_files_in_dir(self, folder, is_extra_dir=False):
-        md_files = []
-        for md_file in os.listdir(folder):
-            # Check if the element in 'folder' has the extension .md and is indeed a file
-            if not (md_file.endswith(".md") and os.path.isfile(os.path.join(folder, md_file))):
+        selected = set(self._filter_paths(sorted(reparse), self.filter_list, jobs=1))
+        old = [notes.pop(path) for path in reparse | removed if path in notes]
+        new = [Note(path) for path in sorted(selected)]
+
+        # Moves the changed notes' links in the link index, and collects whose backlinks may differ
+        affected = set()
+        for note in old:
+            affected.add(note.link.target)
+            for target in note.targets:
+                self.link_index[target].discard(note)
+                affected.add(target)
+        for note in new:
+            notes[note.path] = note
+            affected.add(note.link.target)
+            for target in note.targets:
+                self.link_index.setdefault(target, set()).add(note)
+                affected.add(target)
+
+        self.notes = list(notes.values())
+        self._find_orphans_and_missing()
+
+        dirty = list(new)
+        for note in self.notes:
+            if note.path in selected:
                 continue
+            if note.link.target in affected:
+                backlinks = note.find_backlinks(self.link_index)
+                if [link.target for link in backlinks] != [link.target for link in note.backlinks]:
+                    note.backlinks = backlinks
+                    dirty.append(note)
+                    continue
+            if note.link.target in embedding:
+                dirty.append(note)
+        for note in new:
+            note.backlinks = note.find_backlinks(self.link_index)
+
+        for note in dirty:
+            os.makedirs(os.path.dirname(note.out_path), exist_ok=True)
+        with Writer(precompress=self.precompress) as writer:
+            # Pages of notes that are gone, or no longer pass the tag filter
+            for note in old:
+                if note.path not in selected:
+                    writer.delete(note.out_path)
+            self._write_pages(dirty, writer, jobs=1)
+            if any(note.attachments for note in new):
+                self.collect_assets().copy(writer)
+            if self.search_index:
+                self.search_index.retain(note.link.target for note in self.notes)
+                self.search_index.save(writer)
+        if self.render_cache:
+            self.render_cache.commit()
+
+        return writer.written
+
+
+    def _pages(self, notes, template, jobs=None, pool=None):
+        """Yields every note with its finished page, in order. Notes stream through conversion,
+        rendering and the template one at a time, so only a window of them is held in memory."""
+        def texts():
+            for note, content in zip(notes, self._convert_notes(notes, jobs, pool)):
+                if self.manifest:
+                    self.manifest.record_embeds(note, GLOBAL.EMBEDS.dependencies.get(note.link.target, set()) - {note.link.target})
+                # Indexed from the same converted text that gets rendered
+                if self.search_index:
+                    self.search_index.add(note, content)
+                yield content
+                if note.backlinks:
+                    yield note.backlinks_markdown()
+
+        # Rendered in input order, so the output is the same regardless of the number of jobs
+        rendered = self._render_markdown(texts(), jobs, pool)
+        for note in notes:
+            LOG.debug("Exporting %s...", note.title)
+
+            # Rendering happens as the HTML is taken, so it is attributed to the note as well
+            with PROFILER.note(note.path):
+                content = wrap_content(next(rendered))
+                backlinks = next(rendered) if note.backlinks else ""
+                html = template.render(os.path.dirname(note.out_path),
+                                       title=note.title, content=content, backlinks=backlinks)
+            yield note, html
 
-            note = Note(os.path.join(folder, md_file))
 
-            md_files.append(note)
-            # Filter tags
-            # if self.filter:
-            #     if set(self.filter).intersection(set(note.tags)):
-            #         md_files.append(note)
-            #         break
-            #     continue
-            # else:
-            #     md_files.append(note)
+    def _convert_notes(self, notes, jobs=None, pool=None):
+        """Yields the converted Markdown of every note in 'notes', in order. The notes are read and
+        converted in the process pool, and only their Markdown comes back."""
+        jobs = self.jobs if jobs is None else jobs
+        for note, (content, dependencies) in zip(notes, pool_map(convert_note, [note.path for note in notes], jobs, pool=pool)):
+            # Workers only know the embeds of the notes they converted
+            GLOBAL.EMBEDS.dependencies[note.link.target] = set(dependencies)
+            yield content
 
+
+    def _render_markdown(self, texts, jobs=None, pool=None):
+        """Yields the HTML of every Markdown string in 'texts', in order. Whatever the render cache
+        doesn't have is rendered in the process pool, in batches of the renderer's batch size, and
+        added to the cache. 'texts' is consumed lazily, so it may be a generator."""
+        jobs = self.jobs if jobs is None else jobs
+        if not self.render_cache:
+            for batch in pool_map(render_markdown_batch, self._batches(texts), jobs, pool=pool):
+                yield from batch
+            return
+
+        # Keys and cache hits wait here in input order, while the misses are sent to the pool
+        queue = deque()
+
+        def misses():
+            for text in texts:
+                key = self.render_cache.key(text)
+                html = self.render_cache.get(key)
+                queue.append((key, html))
+                if html is None:
+                    yield text
+
+        for batch in pool_map(render_markdown_batch, self._batches(misses()), jobs, pool=pool):
+            for rendered in batch:
+                while queue[0][1] is not None:
+                    yield queue.popleft()[1]
+                key, _ = queue.popleft()
+                self.render_cache.put(key, rendered)
+                yield rendered
+
+        while queue:
+            yield queue.popleft()[1]
+
+
+    def _batches(self, texts):
+        """Groups 'texts' into lists of the renderer's batch size."""
+        texts = iter(texts)
+        while True:
+            batch = list(islice(texts, self.renderer.batch_size))
+            if not batch:
+                return
+            yield batch
+
+
+    def _notes_to_render(self):
+        """Returns the notes that need rendering. Without incremental builds, that is all of them."""
+        if not self.incremental:
+            return self.notes
+
+        options = self.precompress + (["search"] if self.search else []) \
+            + (["legacy-template"] if self.legacy_template else [])
+        self.manifest = Manifest(GLOBAL.OUTPUT_DIR, getattr(self, "html_template", ""), options, stats=self.stats)
+        return [note for note in self.notes if self.manifest.needs_render(note)]
+
+
+    def _find_files(self, filter_list=[]):
+        md_paths, attachment_paths = self._find_paths()
+        self.md_paths = md_paths
+
+        # Links are resolved against every note in the vault, including those filtered out
+        GLOBAL.NOTE_INDEX = NoteIndex(md_paths)
+        GLOBAL.ATTACHMENTS = NoteIndex(attachment_paths)
+        GLOBAL.EMBEDS = Embeds()
+
+        if self.partition is None:
+            md_files = self._parse_notes(self._filter_paths(md_paths, filter_list))
+            LOG.info(f"Found {len(md_files)} notes!")
+            return md_files
+
+        index, count = self.partition
+        if self.links is not None:
+            # The other partitions filtered and parsed their own notes
+            try:
+                self.others = merge_links(self.links, self.partition)
+            except PartitionError as e:
+                LOG.error(f"{e}, aborting.")
+                sys.exit()
+            md_paths = [path for path in md_paths if partition_of(note_key(path), count) == index]
+
+        md_files = []
+        for note in self._parse_notes(self._filter_paths(md_paths, filter_list)):
+            if partition_of(note.link.target, count) == index:
+                md_files.append(note)
+            else:
+                self.others.append(note)
+
+        LOG.info(f"Found {len(md_files)} notes in partition {index} of {count}, linked from {len(self.others)} others!")
         return md_files
+
+
+    @uses_config
+    def export_links(self, file):
+        """Writes the title, links and tags of the notes of this partition to 'file', for the
+        partitions that export the notes, instead of each of them parsing the whole vault."""
+        write_links(self.notes, file, self.partition)
+        LOG.info(f"Wrote the links of {len(self.notes)} notes to \"{file}\"")
+
+
+    def files(self):
+        """Yields the vault relative path and the os.DirEntry of every file in the folders the
+        vault takes notes from, but those it ignores and the output directory."""
+        root = self.config.VAULT_ROOT
+        folders = None if self.recursive else [root] + list(self.extra_folders or [])
+        return scan(root, folders, self.ignore, skip=[self.config.OUTPUT_DIR])
+
+
+    @profiled("vault.find_paths")
+    def _find_paths(self):
+        """Returns the paths of the notes and of the attachments in the vault, found in a single
+        walk. The stat data of each note is kept in 'self.stats' by its vault relative path, so
+        the manifest doesn't ask for it again."""
+        self.stats = {}
+        if GLOBAL.SOURCES is not None:
+            # Every note among the sources is part of the vault
+            return [os.path.join(GLOBAL.VAULT_ROOT, *key.split("/")) for key in GLOBAL.SOURCES if key.endswith(".md")], []
+
+        md_paths = []
+        attachment_paths = []
+        for path, entry in self.files():
+            if path.endswith(".md"):
+                md_paths.append(entry.path)
+                self.stats[path] = entry.stat()
+            else:
+                attachment_paths.append(entry.path)
+
+        LOG.debug("Found %d notes and %d attachments.", len(md_paths), len(attachment_paths))
+        return md_paths, attachment_paths
+
+
+    @profiled("vault.filter_notes")
+    def _filter_paths(self, md_paths, filter_list, jobs=None):
+        """Returns the paths of the notes matching the tag filter. Only the tags are read from
+        each note, so notes that are filtered out are never fully parsed."""
+        try:
+            expr = parse_filter(filter_list)
+        except FilterError as e:
+            LOG.error(f"{e}, aborting.")
+            sys.exit()
+        if expr is None:
+            return md_paths
+
+        index = tag_index(pool_map(scan_tags, md_paths, self.jobs if jobs is None else jobs))
+        selected = evaluate(expr, index, len(md_paths))
+        md_paths = [md_paths[i] for i in members(selected, len(md_paths))]
+
+        LOG.info(f"Selected {len(md_paths)} notes matching the tag filter {describe(expr)}")
+        return md_paths
+
+
+    @profiled("vault.parse_notes")
+    def _parse_notes(self, md_paths):
+        # Reading and parsing the notes is the expensive part, so that is what runs in parallel
+        return list(pool_map(Note, md_paths, self.jobs))
@@ -0,0 +1,63 @@
+import os
+import time
+from oboe import LOG
+
+# Seconds between two looks at the vault
+WATCH_INTERVAL = 0.25
+
+
+class Watcher:
+    """Watches a vault for changed notes by polling their mtimes, and updates the export of an
+    in-memory Vault with only what changed."""
+
+    def __init__(self, vault, interval=WATCH_INTERVAL):
+        self.vault = vault
+        self.interval = interval
+        self.files = self.snapshot()
+
+
+    def snapshot(self):
+        """Maps the path of every note to its mtime and size. The folders are walked again every
+        time, to notice new ones."""
+        files = {}
+        for path, entry in self.vault.files():
+            if path.endswith(".md"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+
+    def poll(self):
+        """Returns the paths of the notes that were added or modified, and of those removed,
+        since the last poll."""
+        files = self.snapshot()
+        changed = [path for path, stat in files.items() if self.files.get(path) != stat]
+        removed = [path for path in self.files if path not in files]
+        self.files = files
+        return changed, removed
+
+
+    def run(self):
+        # Watching runs until stopped, often under a service manager or with its output piped,
+        # where buffered messages would show up long after the update they are about
+        LOG.set_buffered(False)
+        LOG.info(f"Watching \"{os.path.abspath(self.vault.config.VAULT_ROOT)}\" for changes. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(self.interval)
+                changed, removed = self.poll()
+                if not (changed or removed):
+                    continue
+
+                start = time.perf_counter()
+                written = self.vault.update(changed, removed)
+                LOG.info(f"{len(changed)} changed, {len(removed)} removed: wrote {written} pages in "
+                         f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        except KeyboardInterrupt:
+            LOG.info("Stopped watching.")
+        finally:
+            if self.vault.render_cache:
+                self.vault.render_cache.close()
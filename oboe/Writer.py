@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+from oboe.utils import write, encode
+from oboe.filecopy import copy_file
+from oboe.compress import precompress, precompress_file, remove_siblings, compressible, EXTENSIONS
+from oboe.profiling import PROFILER
+
+# Number of pages waiting to be written before rendering has to wait for the disk
+QUEUE_SIZE = 64
+
+# Threads writing pages. Writes mostly wait on the disk, so a few of them keep it busy.
+THREADS = 4
+
+
+class Writer:
+    """Writes pages from a small pool of threads, taking them from a bounded queue, so rendering
+    carries on while pages are written without pages piling up in memory. Pages whose file
+    already holds the same bytes are left untouched, and counted as unchanged.
+
+    Pages get compressed siblings in each of the 'precompress' formats, like page.html.gz, and
+    so do copied files that are text, like stylesheets. Siblings in the other formats, left by
+    earlier builds, are removed, so they don't go on serving old content."""
+
+    def __init__(self, queue_size=QUEUE_SIZE, threads=None, precompress=()):
+        self.precompress = precompress
+        self.stale_formats = [name for name in EXTENSIONS if name not in precompress]
+        if threads is None:
+            # Compressing releases the GIL, so with a thread per core pages compress in parallel
+            threads = max(THREADS, os.cpu_count() or 1) if precompress else THREADS
+        # The profiler keeps track of nested stages, which only works within a single thread
+        self.threaded = not PROFILER.enabled
+        self.written = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self._lock = threading.Lock()
+        self._error = None
+        if self.threaded:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._threads = [threading.Thread(target=self._run, name=f"oboe-writer-{i}", daemon=True)
+                             for i in range(threads)]
+            for thread in self._threads:
+                thread.start()
+
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is None:
+                try:
+                    item[0](*item[1:])
+                except Exception as e:
+                    # Raised again in the thread that uses the writer
+                    self._error = e
+
+
+    def _count(self, changed, deleted=False):
+        with self._lock:
+            if deleted:
+                self.deleted += changed
+            elif changed:
+                self.written += 1
+            else:
+                self.unchanged += 1
+
+
+    def _write(self, text, file):
+        changed = write(text, file)
+        if self.precompress:
+            # Siblings are only compressed again when the page changed
+            precompress(encode(text), file, self.precompress, changed)
+        remove_siblings(file, self.stale_formats)
+        self._count(changed)
+
+
+    def _copy(self, source, files, link):
+        # Copies after the first hold the same content, so they are linked to the first one
+        for i, file in enumerate(files):
+            changed = copy_file(source, file, link) if i == 0 else copy_file(files[0], file, link=True)
+            if compressible(file):
+                if self.precompress:
+                    precompress_file(file, self.precompress, changed)
+                remove_siblings(file, self.stale_formats)
+            self._count(changed)
+
+
+    def _delete(self, file):
+        try:
+            os.remove(file)
+            changed = True
+        except FileNotFoundError:
+            changed = False
+        remove_siblings(file, EXTENSIONS)
+        self._count(changed, deleted=True)
+
+
+    def _submit(self, action, *args):
+        if not self.threaded:
+            action(*args)
+        else:
+            if self._error is not None:
+                raise self._error
+            self._queue.put((action, *args))
+
+
+    def write(self, text, file):
+        self._submit(self._write, text, file)
+
+
+    def copy(self, source, files, link=False):
+        """Copies the file at 'source' to each of 'files' that isn't up to date, in the kernel.
+        With 'link', they are hardlinks of 'source' where possible."""
+        self._submit(self._copy, source, list(files), link)
+
+
+    def delete(self, file):
+        """Deletes 'file', if it exists."""
+        self._submit(self._delete, file)
+
+
+    def close(self):
+        """Waits for every page to be written."""
+        if self.threaded:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            if self._error is not None:
+                raise self._error
+
+
+    def summary(self):
+        return f"{self.written} files written, {self.unchanged} unchanged, {self.deleted} deleted."
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,36 +1,66 @@
-from .config import GLOBAL
+from .config import GLOBAL, BuildConfig
 from .log import Logger
 LOG = Logger("INFO")
 
 import sys
 import argparse
 import time
-from .Vault import Vault
-from .Note import Note
+from types import ModuleType
+from importlib import import_module
+from .config import RENDERER_NAMES
+
+__all__ = ["GLOBAL", "BuildConfig", "LOG", "main", "serve", "Vault", "Note", "Watcher", "Server"]
+
+# Imported when first used, so parsing the arguments doesn't wait for the renderers, the regex
+# module or the HTTP server, which most runs never use
+LAZY = {"Vault": ".Vault", "Note": ".Note", "Watcher": ".Watcher", "Server": ".Server"}
+
+
+class _Package(ModuleType):
+    def __setattr__(self, name, value):
+        # Importing a submodule sets it as an attribute of the package, which would hide the class
+        # of the same name, whether it is imported here or anywhere else, so the class is set instead
+        if name in LAZY and isinstance(value, ModuleType) and value.__name__ == f"{__name__}.{name}":
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
 
-def main():
-    parser = argparse.ArgumentParser(
-        prog="oboe",
-        description="Converts an Obsidian vault into HTML")
 
+def __getattr__(name):
+    # Only called for names not set yet, as importing the module sets the class
+    if name not in LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import_module(LAZY[name], __name__)
+    return globals()[name]
+
+
+def add_vault_arguments(parser):
+    """Arguments that select and format the notes, shared by building and serving a vault."""
     parser.add_argument("Vault",
                         metavar="vault",
                         type=str,
                         help="Path to the vault root")
 
-    parser.add_argument("-o", "--output_directory",
-                        default="./html",
-                        help="Path to place the generated HTML")
-
     parser.add_argument("-t", "--template",
                         default=None,
                         help="Path to HTML template")
 
+    parser.add_argument("--legacy-template",
+                        action="store_true",
+                        help="The template escapes curly braces by doubling them, as older versions of Oboe required.")
+
     parser.add_argument("-d", "--sub-directories",
                         nargs="*",
                         default=None,
                         help="Extra sub-directories in vault that you want included")
 
+    parser.add_argument("-x", "--exclude",
+                        action="append",
+                        default=[],
+                        help="Leave out files matching this gitignore-style pattern, like \"Templates/\". Can be given several times.")
+
     parser.add_argument("-f", "--filter",
                         nargs="+",
                         default=[],
@@ -48,21 +78,196 @@ def main():
                         action="store_false",
                         help="Whether to remove a '- ' before each backlink in html.")
 
-    args = parser.parse_args()
+    parser.add_argument("-r", "--renderer",
+                        choices=RENDERER_NAMES,
+                        default="markdown2",
+                        help="Markdown renderer. mistune is faster, pandoc converts notes in batches.")
+
 
+def configure(args):
     if args.log_level:
         LOG.set_level(args.log_level)
 
     GLOBAL.HTML_LINK_EXTENSIONS = args.add_file_extensions
     GLOBAL.BACKLINK_DASH = args.omit_backlink_dash
     GLOBAL.VAULT_ROOT = args.Vault
+    GLOBAL.RENDERER = args.renderer
+
+
+def main():
+    if sys.argv[1:2] == ["serve"]:
+        return serve(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(
+        prog="oboe",
+        description="Converts an Obsidian vault into HTML")
+
+    add_vault_arguments(parser)
+
+    parser.add_argument("-o", "--output_directory",
+                        default="./html",
+                        help="Path to place the generated HTML")
+
+    parser.add_argument("-i", "--incremental",
+                        action="store_true",
+                        help="Only re-render notes that changed since the last build. Keeps a manifest in the output directory.")
+
+    parser.add_argument("-j", "--jobs",
+                        type=int,
+                        default=1,
+                        help="Number of processes used to parse and render notes. 0 uses one per CPU core.")
+
+    parser.add_argument("-c", "--cache",
+                        default=None,
+                        help="Path to a file where rendered notes are cached between builds.")
+
+    parser.add_argument("--cache-size",
+                        type=int,
+                        default=512,
+                        help="Size limit of the cache file in megabytes. Least recently used entries are evicted first.")
+
+    parser.add_argument("--precompress",
+                        default="",
+                        help="Also write compressed copies of every page and stylesheet, e.g. \"gzip,brotli\". Brotli needs the brotli module.")
+
+    parser.add_argument("--link-assets",
+                        action="store_true",
+                        help="Hardlink stylesheets and attachments into the output directory instead of copying them, where the filesystem allows.")
+
+    parser.add_argument("-s", "--search",
+                        action="store_true",
+                        help="Also write a sharded search index into the search directory of the output.")
+
+    parser.add_argument("--partition",
+                        default=None,
+                        help="Only export partition i of N, given as \"i/N\", e.g. one per job of a CI matrix. Notes are assigned to partitions by a hash of their path.")
+
+    parser.add_argument("--emit-links",
+                        default=None,
+                        help="Instead of exporting, write the links and tags of the notes (of the partition) to this JSON file, for --links.")
+
+    parser.add_argument("--links",
+                        nargs="+",
+                        default=None,
+                        help="JSON files written by --emit-links for the other partitions, merged into the backlinks instead of parsing the notes of those partitions.")
+
+    parser.add_argument("--profile",
+                        nargs="?",
+                        const="oboe-profile.json",
+                        default=None,
+                        help="Write a JSON report of the time spent in each stage and the slowest notes to this file.")
+
+    parser.add_argument("--profile-top",
+                        type=int,
+                        default=10,
+                        help="Number of slowest notes listed in the profile report.")
+
+    parser.add_argument("--profile-dump",
+                        default=None,
+                        help="Also write cProfile statistics to this file, for pstats, snakeviz or flameprof.")
+
+    parser.add_argument("-w", "--watch",
+                        action="store_true",
+                        help="Keep running after the build, and update the output whenever notes change.")
+
+    args = parser.parse_args()
+
+    configure(args)
     GLOBAL.OUTPUT_DIR = args.output_directory
 
+    from .compress import parse_formats
+    from .partition import parse_partition
+    from .profiling import PROFILER
+    if args.profile or args.profile_dump:
+        PROFILER.enable(cprofile=bool(args.profile_dump))
+        if args.jobs != 1:
+            # Worker processes would keep their timings to themselves
+            LOG.info("Profiling runs in a single process, ignoring --jobs.")
+            args.jobs = 1
+
+    if args.watch and not args.cache:
+        # Keeps unchanged notes from being rendered again on every update
+        args.cache = ":memory:"
+
+    try:
+        precompress = parse_formats(args.precompress)
+        partition = parse_partition(args.partition)
+    except ValueError as e:
+        LOG.error(f"{e}, aborting.")
+        sys.exit()
+    if partition and (args.watch or args.search):
+        LOG.error("A partition can't be watched or searched on its own, aborting.")
+        sys.exit()
+    if partition and args.incremental:
+        # Partitions exported into the same folder would share the manifest, and delete each other's pages
+        LOG.error("A partition can't be built incrementally, aborting.")
+        sys.exit()
+    # The metadata of a partition doesn't need the links of the others
+    links = [] if args.emit_links and partition else args.links
+
     time_begin = time.time()
 
-    vault = Vault(extra_folders=args.sub_directories, html_template=args.template, filter_list=args.filter)
-    vault.export_html()
+    from .Vault import Vault
+    vault = Vault(extra_folders=args.sub_directories, html_template=args.template, filter_list=args.filter,
+                  incremental=args.incremental, jobs=args.jobs,
+                  render_cache=args.cache, render_cache_size=args.cache_size, precompress=precompress,
+                  search=args.search, link_assets=args.link_assets, exclude=args.exclude,
+                  partition=partition, links=links, legacy_template=args.legacy_template)
+    if args.emit_links:
+        vault.export_links(args.emit_links)
+    else:
+        vault.export_html()
 
     time_end = time.time()
 
-    LOG.debug(f"Oboe used {round(time_end - time_begin, 2)}s to finish.")
+    LOG.debug("Oboe used %.2fs to finish.", time_end - time_begin)
+
+    if args.watch:
+        from .Watcher import Watcher
+        Watcher(vault).run()
+
+    if args.profile:
+        PROFILER.write_report(args.profile, slowest=args.profile_top)
+        LOG.info(f"Wrote profile report to \"{args.profile}\"")
+    if args.profile_dump:
+        PROFILER.dump_cprofile(args.profile_dump)
+        LOG.info(f"Wrote cProfile statistics to \"{args.profile_dump}\"")
+
+
+def serve(argv):
+    parser = argparse.ArgumentParser(
+        prog="oboe serve",
+        description="Serves an Obsidian vault as HTML, rendering each page when it is first requested")
+
+    add_vault_arguments(parser)
+
+    parser.add_argument("--host",
+                        default="127.0.0.1",
+                        help="Address to listen on")
+
+    parser.add_argument("-p", "--port",
+                        type=int,
+                        default=8000,
+                        help="Port to listen on")
+
+    parser.add_argument("--cache-size",
+                        type=int,
+                        default=64,
+                        help="Size limit of the in-memory page cache in megabytes.")
+
+    parser.add_argument("--threads",
+                        type=int,
+                        default=8,
+                        help="Number of requests handled at the same time.")
+
+    args = parser.parse_args(argv)
+
+    configure(args)
+    # Pages are not written anywhere, but their URLs are those of a vault exported here
+    GLOBAL.OUTPUT_DIR = "html"
+
+    from .Vault import Vault
+    from .Server import Server
+    vault = Vault(extra_folders=args.sub_directories, html_template=args.template, filter_list=args.filter,
+                  exclude=args.exclude, legacy_template=args.legacy_template)
+    Server(vault, host=args.host, port=args.port, cache_size=args.cache_size, threads=args.threads).run()
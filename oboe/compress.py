@@ -0,0 +1,71 @@
+import os
+import gzip
+from importlib.util import find_spec
+from oboe.utils import write_bytes
+from oboe.profiling import profiled
+from oboe import LOG
+
+# File extension of the compressed siblings of each format
+EXTENSIONS = {"gzip": ".gz", "brotli": ".br"}
+
+
+def gzip_compress(data):
+    # No timestamp in the header, so the same page always compresses to the same bytes
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    import brotli
+    return brotli.compress(data, mode=brotli.MODE_TEXT)
+
+
+COMPRESSORS = {"gzip": gzip_compress, "brotli": brotli_compress}
+
+# Copied files worth compressing. Images and other binary formats are compressed already.
+COMPRESSIBLE = {".css", ".js", ".json", ".svg", ".txt", ".csv", ".xml", ".html"}
+
+
+def compressible(file):
+    return os.path.splitext(file)[1].lower() in COMPRESSIBLE
+
+
+def parse_formats(value):
+    """Parses a comma separated list of formats, like "gzip,brotli", leaving out brotli if the
+    module isn't installed. Raises a ValueError for unknown formats."""
+    formats = []
+    for name in filter(None, (name.strip().lower() for name in value.split(","))):
+        if name not in COMPRESSORS:
+            raise ValueError(f"Unknown compression format \"{name}\", choose from {', '.join(COMPRESSORS)}")
+        if name == "brotli":
+            if find_spec("brotli") is None:
+                LOG.warning("Brotli is not installed, skipping .br files. Install it with \"pip install brotli\".")
+                continue
+        if name not in formats:
+            formats.append(name)
+
+    return formats
+
+
+@profiled("precompress", size=lambda data, file, formats, changed=True: len(data))
+def precompress(data, file, formats, changed=True):
+    """Writes the compressed siblings of 'file', holding 'data', in each of 'formats'. Unless the
+    file 'changed', siblings that already exist are kept as they are."""
+    for name in formats:
+        sibling = file + EXTENSIONS[name]
+        if changed or not os.path.isfile(sibling):
+            write_bytes(COMPRESSORS[name](data), sibling)
+
+
+def precompress_file(file, formats, changed=True):
+    """Like precompress, for a file that is already written. It is only read if a sibling needs writing."""
+    if changed or not all(os.path.isfile(file + EXTENSIONS[name]) for name in formats):
+        with open(file, "rb") as f:
+            precompress(f.read(), file, formats, changed)
+
+
+def remove_siblings(file, formats):
+    for name in formats:
+        try:
+            os.remove(file + EXTENSIONS[name])
+        except FileNotFoundError:
+            pass
@@ -1,6 +1,78 @@
-class GLOBAL:
-    HTML_LINK_EXTENSIONS = False
-    BACKLINK_DASH = True
-    VAULT_ROOT = ""
-    OUTPUT_DIR = ""
-    STYLESHEETS = []
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Markdown renderers, as named on the command line. Listed here so the arguments can be parsed
+# without importing the renderers themselves.
+RENDERER_NAMES = ("markdown2", "mistune", "pandoc")
+
+
+class BuildConfig:
+    """Settings and shared state of one build. Every Vault has its own, so several vaults can be
+    built in one process, one after the other or in parallel threads.
+
+    With 'sources', a mapping from vault relative paths like "sub/Note.md" to their text, notes
+    are read from there instead of from 'vault_root' on disk."""
+
+    def __init__(self, vault_root="", output_dir="", html_link_extensions=False, backlink_dash=True,
+                 renderer="markdown2", sources=None):
+        self.HTML_LINK_EXTENSIONS = html_link_extensions
+        self.BACKLINK_DASH = backlink_dash
+        self.VAULT_ROOT = vault_root
+        self.OUTPUT_DIR = output_dir
+        self.RENDERER = renderer
+        self.SOURCES = sources
+        # Set by the Vault once its notes are found
+        self.NOTE_INDEX = None
+        self.ATTACHMENTS = None
+        self.EMBEDS = None
+
+
+    @contextmanager
+    def active(self):
+        """Makes this the config GLOBAL refers to, in the current thread."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+
+# Used wherever no other config is active, which is all there is for the command line
+DEFAULT = BuildConfig()
+
+_active = ContextVar("oboe_config", default=None)
+
+
+def current():
+    """Returns the config active in the current thread."""
+    return _active.get() or DEFAULT
+
+
+def set_current(config):
+    """Makes 'config' the active config of the current thread, until another is made active."""
+    _active.set(config)
+
+
+def uses_config(method):
+    """Runs a method with the config of its object, 'self.config', active."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.config.active():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class _Global:
+    """The config active in the current thread. Reading or setting an attribute of GLOBAL reads
+    or sets that of the config."""
+
+    def __getattr__(self, name):
+        return getattr(current(), name)
+
+
+    def __setattr__(self, name, value):
+        setattr(current(), name, value)
+
+
+GLOBAL = _Global()
@@ -0,0 +1,163 @@
+import os
+import json
+import regex as re
+from oboe import LOG
+
+# Gitignore-style patterns in this file, at the root of the vault, leave files out of the export
+IGNORE_FILE = ".oboeignore"
+
+# Obsidian's settings, whose "Excluded files" are left out as well
+OBSIDIAN_SETTINGS = os.path.join(".obsidian", "app.json")
+
+
+def translate(pattern):
+    """Regular expression matching what the gitignore pattern 'pattern' matches. Expects the !
+    and trailing / to be stripped already."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            members = pattern[i + 1:end].replace("\\", "\\\\")
+            parts.append("[" + ("^" + members[1:] if members.startswith("!") else members) + "]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+
+    return "".join(parts)
+
+
+class IgnoreRules:
+    """Which files and folders of a vault are left out. 'patterns' are lines of a .gitignore,
+    where the last pattern matching a path decides. 'filters' are Obsidian's excluded files,
+    each the start of a path or a /regular expression/."""
+
+    def __init__(self, patterns=(), filters=()):
+        self.patterns = []
+        for line in patterns:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            line = line[1:] if negate else line
+            folders_only = line.endswith("/")
+            line = line.rstrip("/")
+            # Patterns with a slash are relative to the vault root, others match a name in any folder
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                self.patterns.append((re.compile(translate(line)), negate, folders_only, anchored))
+
+        self.prefixes = []
+        self.expressions = []
+        for text in filters:
+            if len(text) > 2 and text.startswith("/") and text.endswith("/"):
+                self.expressions.append(re.compile(text[1:-1]))
+            elif text:
+                self.prefixes.append(text)
+        self.prefixes = tuple(self.prefixes)
+
+
+    def __bool__(self):
+        return bool(self.patterns or self.prefixes or self.expressions)
+
+
+    def ignored(self, path, is_dir=False):
+        """Whether the file, or folder with 'is_dir', at the vault relative 'path' is left out."""
+        name = path.rsplit("/", 1)[-1]
+        ignored = False
+        for pattern, negate, folders_only, anchored in self.patterns:
+            if (is_dir or not folders_only) and pattern.fullmatch(path if anchored else name):
+                ignored = not negate
+        if ignored:
+            return True
+
+        # Obsidian matches folders by their path with a trailing slash
+        path = path + "/" if is_dir else path
+        return path.startswith(self.prefixes) or any(pattern.search(path) for pattern in self.expressions)
+
+
+def load_rules(root, exclude=()):
+    """Returns the IgnoreRules of the vault at 'root': the patterns in its .oboeignore file and in
+    'exclude', and the files excluded in Obsidian's settings."""
+    patterns = []
+    try:
+        with open(os.path.join(root, IGNORE_FILE), encoding="utf8") as f:
+            patterns = f.read().splitlines()
+    except FileNotFoundError:
+        pass
+
+    filters = []
+    try:
+        with open(os.path.join(root, OBSIDIAN_SETTINGS), encoding="utf8") as f:
+            filters = json.load(f).get("userIgnoreFilters") or []
+    except FileNotFoundError:
+        pass
+    except (ValueError, AttributeError):
+        LOG.warning(f"Cannot read Obsidian's settings in \"{os.path.join(root, OBSIDIAN_SETTINGS)}\", "
+                    f"not excluding its excluded files.")
+
+    return IgnoreRules(patterns + list(exclude), filters)
+
+
+def scan(root, folders=None, rules=None, skip=()):
+    """Yields the vault relative path, with / separators, and the os.DirEntry of every file in
+    the vault at 'root', notes and attachments alike, in a single walk and in a stable order.
+    Hidden files and folders like .obsidian are skipped, as are the folders in 'skip' and
+    whatever 'rules' ignore. With 'folders', only the files directly in those folders are found,
+    instead of those in every folder of the vault.
+
+    Entries know whether they are a file or folder without another system call, and keep their
+    stat data once asked for it."""
+    skip = {os.path.abspath(folder) for folder in skip}
+    # Checked for every entry, so rules that ignore nothing aren't asked at all
+    rules = rules or None
+    if folders is None:
+        stack = [(root, "")]
+    else:
+        stack = []
+        for folder in reversed(folders):
+            prefix = os.path.relpath(folder, root).replace(os.sep, "/") + "/"
+            prefix = "" if prefix == "./" else prefix
+            if not (rules and prefix and rules.ignored(prefix[:-1], is_dir=True)):
+                stack.append((folder, prefix))
+
+    while stack:
+        folder, prefix = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except FileNotFoundError:
+            # Removed while the vault is watched
+            continue
+
+        subfolders = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            path = prefix + entry.name
+            if entry.is_dir():
+                if folders is None and not (skip and os.path.abspath(entry.path) in skip) \
+                        and not (rules and rules.ignored(path, is_dir=True)):
+                    subfolders.append((entry.path, path + "/"))
+            elif entry.is_file() and not (rules and rules.ignored(path)):
+                yield path, entry
+
+        # Depth first, each folder's subfolders in order
+        stack.extend(reversed(subfolders))
@@ -0,0 +1,105 @@
+import os
+import errno
+import shutil
+import tempfile
+from oboe.utils import UMASK
+from oboe.profiling import profiled
+
+# Errors meaning the kernel or the filesystem can't copy between these two files by itself
+UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+# Errors meaning the filesystem can't hardlink these two files
+CANNOT_LINK = UNSUPPORTED | {errno.EPERM, errno.EACCES, errno.EMLINK}
+
+
+def up_to_date(source_stat, file):
+    """Whether 'file' already holds a copy of the file with the stat data 'source_stat': it is
+    the same file, or it has the same size and was written since the source last changed."""
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return False
+    if (stat.st_dev, stat.st_ino) == (source_stat.st_dev, source_stat.st_ino):
+        return True
+    return stat.st_size == source_stat.st_size and stat.st_mtime_ns >= source_stat.st_mtime_ns
+
+
+def _copy_file_range(source, target, size):
+    copied = 0
+    while copied < size:
+        count = os.copy_file_range(source, target, size - copied)
+        if count == 0:
+            break
+        copied += count
+
+
+def _sendfile(source, target, size):
+    offset = 0
+    while offset < size:
+        count = os.sendfile(target, source, offset, size - offset)
+        if count == 0:
+            break
+        offset += count
+
+
+def transfer(source, target, size):
+    """Copies 'size' bytes from the file descriptor 'source' to 'target' within the kernel, with
+    copy_file_range, which lets filesystems like Btrfs and XFS share the blocks, or else
+    sendfile. Only where neither works are the bytes read into Python."""
+    methods = [method for name, method in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile))
+               if hasattr(os, name)]
+    for method in methods:
+        try:
+            method(source, target, size)
+            return
+        except OSError as e:
+            if e.errno not in UNSUPPORTED:
+                raise
+            # Start over with the next method
+            os.lseek(source, 0, os.SEEK_SET)
+            os.lseek(target, 0, os.SEEK_SET)
+            os.ftruncate(target, 0)
+
+    with open(source, "rb", closefd=False) as fsource, open(target, "wb", closefd=False) as ftarget:
+        shutil.copyfileobj(fsource, ftarget)
+
+
+@profiled("copy", size=lambda source, file, link=False: os.path.getsize(source))
+def copy_file(source, file, link=False):
+    """Copies 'source' to 'file', unless 'file' is already up to date. With 'link', 'file' is
+    made a hardlink of 'source' where the filesystem allows, which copies nothing at all. The
+    file is replaced atomically, like pages are. Returns whether the file was written."""
+    stat = os.stat(source)
+    if up_to_date(stat, file):
+        return False
+
+    fd, temp = tempfile.mkstemp(prefix=".oboe-", suffix=".tmp", dir=os.path.dirname(file) or ".")
+    try:
+        if link:
+            # Hardlinked under the temporary name, which has to be free for that
+            os.close(fd)
+            fd = None
+            os.remove(temp)
+            try:
+                os.link(source, temp)
+                os.replace(temp, file)
+                return True
+            except OSError as e:
+                if e.errno not in CANNOT_LINK:
+                    raise
+                fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+
+        with open(source, "rb") as f:
+            transfer(f.fileno(), fd, stat.st_size)
+        os.close(fd)
+        fd = None
+        os.chmod(temp, 0o666 & ~UMASK)
+        os.replace(temp, file)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        if os.path.lexists(temp):
+            os.remove(temp)
+        raise
+
+    return True
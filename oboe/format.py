@@ -1,50 +1,104 @@
-import regex as re
-from oboe.utils import slug_case, md_link
-from oboe import LOG
+import os
+from urllib.parse import quote
+from oboe.patterns import IMAGE_SIZE, OBSIDIAN_SYNTAX
+from oboe.Template import SITE_ROOT
 
 
-def format_tags(document, tags):
-    """Obsidian style tags. Removes #-icon and adds a span tag."""
-    for tag in tags:
-        document = document.replace("#" + tag, "<span class=\"tag\">" + tag + "</span>")
+# Attachments shown as images when embedded. Other attachments are linked to.
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".svg", ".webp", ".avif"}
+
 
-    return document
+def format_tag(tag):
+    """Obsidian style tags. Removes #-icon and adds a span tag."""
+    return "<span class=\"tag\">" + tag + "</span>"
 
 
-def format_blockrefs(document):
+def format_blockref(blockref):
     """Formats Obsidian block references into a span element that can be linked to"""
-    regex = re.compile(r" \^(.+)$", re.MULTILINE)
-    matches = regex.finditer(document)
+    return f"<span id=\"{blockref}\"></span>"
 
-    for match in matches:
-        document = document.replace(match.group(), f"<span id=\"{match.group(1)}\"></span>")
-        
-    return document
 
-def format_highlights(document):
+def format_highlight(text):
     """Formats the '==highlight==' directly into HTML."""
-    regex = re.compile(r"==(.*?)==")
-    matches = regex.finditer(document)
-
-    for match in matches:
-        document = document.replace(match.group(), f"<mark class=\"highlight\">{match.group(1)}</mark>)")
-        
-    return document
-    
-def format_links(document, links):
-    for link in links:
-        document = document.replace(f"[[{link.obsidian_link}]]", link.md_link())
-        
-    return document
-    
-def format_code_blocks(document):
-    regex = re.compile(r"```(.*)$\n([\S\s]*?)\n```", re.MULTILINE)
-    matches = regex.finditer(document)
-
-    for match in matches:
-        # Format as plaintext if no language specified
-        lang = match.group(1) if match.group(1) else "plaintext"
-        document = document.replace(match.group(),
-                    f"<pre><code class=\"{lang} lang-{lang} language-{lang}\">{match.group(2)}</code></pre>")
-        
-    return document
\ No newline at end of file
+    return f"<mark class=\"highlight\">{text}</mark>"
+
+
+def format_link(text, links, embed=None):
+    """Formats a wiki-link as a Markdown link, using the matching Link object in 'links'. Embeds
+    are replaced by the content they embed, when there is any."""
+    link = links.get(text)
+    if link is None:
+        return f"{embed or ''}[[{text}]]"
+    if link.attachment is not None:
+        return format_attachment(link, embed)
+    if embed:
+        content = link.get_content()
+        if content is not None:
+            return format_embed(content)
+        # Notes that can't be embedded, like those embedding themselves, are linked to instead
+        if link.resolved:
+            return link.md_link()
+        return embed + link.md_link()
+    return link.md_link()
+
+
+def format_attachment(link, embed=None):
+    """Formats a link to an attachment, or an image for embedded images. The URL is relative to
+    the output root, which the template turns into a path relative to each page."""
+    url = SITE_ROOT + quote(link.attachment)
+    name = link.attachment.rsplit("/", 1)[-1]
+    if not (embed and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS):
+        return f"[{link.alias or name}]({url})"
+
+    # Like Obsidian, ![[image.png|300]] and ![[image.png|300x200]] set the size of the image
+    size = IMAGE_SIZE.fullmatch(link.alias or "")
+    if size:
+        height = f" height=\"{size.group(2)}\"" if size.group(2) else ""
+        return f"<img src=\"{url}\" alt=\"{name}\" width=\"{size.group(1)}\"{height} />"
+    return f"![{link.alias or name}]({url})"
+
+
+def format_embed(content):
+    """Wraps embedded content in a block of its own, in which Markdown is still rendered."""
+    return f"\n\n<div class=\"embed\" markdown=\"1\">\n{content}\n</div>\n\n"
+
+
+def format_code_block(lang, code):
+    # Format as plaintext if no language specified
+    lang = lang if lang else "plaintext"
+    return f"<pre><code class=\"{lang} lang-{lang} language-{lang}\">{code}</code></pre>"
+
+
+def convert_obsidian_syntax(document, links):
+    """Converts Obsidian syntax in 'document' into Markdown in a single pass. 'links' are the
+    Link objects of the note, used to format its wiki-links."""
+    links = {link.obsidian_link: link for link in links}
+    out = []
+    _scan(document, links, out)
+    return "".join(out)
+
+
+def _scan(document, links, out):
+    pos = 0
+    for match in OBSIDIAN_SYNTAX.finditer(document):
+        out.append(document[pos:match.start()])
+        pos = match.end()
+
+        kind = match.lastgroup
+        if kind == "code_block":
+            out.append(format_code_block(match.group("lang"), match.group("code")))
+        elif kind == "inline_code":
+            out.append(match.group())
+        elif kind == "link":
+            out.append(format_link(match.group("link"), links, match.group("embed")))
+        elif kind == "highlight":
+            # Highlights may contain other syntax, which is converted into a buffer of its own
+            inner = []
+            _scan(match.group("highlight"), links, inner)
+            out.append(format_highlight("".join(inner)))
+        elif kind == "tag":
+            out.append(format_tag(match.group("tag")))
+        elif kind == "blockref":
+            out.append(format_blockref(match.group("blockref")))
+
+    out.append(document[pos:])
@@ -1,5 +1,6 @@
-import inspect
+import sys
 import shutil
+import atexit
 
 
 LEVELS = {
@@ -10,57 +11,117 @@ LEVELS = {
     "CRITICAL": 0
 }
 
+# Number of lines kept in memory before a buffered logger writes them out
+BUFFER_LINES = 256
+
+
+def parse_level(level):
+    try:
+        # Extract log level from string
+        return LEVELS[level.upper()]
+    except (KeyError, AttributeError):
+        # If key does not match, check if log_level is a valid int or else set the level to DEBUG
+        return level if type(level) == int and abs(level) < 5 else 4
+
+
 class Logger:
-    def __init__(self, level):
-        try:
-            # Extract log level from string
-            self.level = LEVELS[level.upper()]
-        except (KeyError, AttributeError):
-            # If key does not match, check if log_level is a valid int or else set the level to DEBUG
-            self.level = level if type(level) == int and abs(level) < 5 else 4
-            
-    
+    """Leveled logger. Calls below the current level return before doing any work, so messages
+    should be passed with lazy %-style arguments, e.g. LOG.debug("Found %s", path)."""
+
+    def __init__(self, level, stream=None, buffered=None):
+        self.level = parse_level(level)
+        # The stream is looked up on every write when not given, to follow redirections of sys.stdout
+        self._stream = stream
+        # None means buffering whenever the output is not a terminal
+        self.buffered = buffered
+        self._buffer = []
+        atexit.register(self.flush)
+
+
+    @property
+    def stream(self):
+        return self._stream if self._stream is not None else sys.stdout
+
+
     def set_level(self, level):
-        self.__init__(level)
-        
-    
+        self.level = parse_level(level)
+
+
+    def set_buffered(self, buffered):
+        self.flush()
+        self.buffered = buffered
+
+
+    def enabled(self, level_name):
+        """Whether messages of 'level_name' would be printed. Useful to guard expensive arguments."""
+        return self.level >= LEVELS[level_name]
+
+
     def print_message(self, msg, level_name, file, *styles):
-        if self.level >= LEVELS[level_name]:
+        stream = self.stream
+        tty = stream.isatty() if hasattr(stream, "isatty") else False
+
+        if tty:
             # If theres room, then first print the name of the calling file right aligned
             left_align_len = len(level_name) + 2 + len(msg)
-            print(right_align(f"({file})", left_align_len=left_align_len), end="\r")
-            
+            print(right_align(f"({file})", left_align_len=left_align_len), end="\r", file=stream)
+
             # Then print the message with the log level styled
-            print(style(level_name, *styles) + ":", msg)
-            
+            print(style(level_name, *styles) + ":", msg, file=stream)
+            return
+
+        line = f"{level_name}: {msg} ({file})\n"
+        buffered = self.buffered if self.buffered is not None else True
+        if not buffered:
+            # Flushed as well, as Python buffers sys.stdout itself when it is a pipe or file
+            stream.write(line)
+            stream.flush()
+            return
+
+        self._buffer.append(line)
+        # Problems are written out immediately, in case the process is about to exit
+        if len(self._buffer) >= BUFFER_LINES or LEVELS[level_name] <= LEVELS["ERROR"]:
+            self.flush()
+
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer = []
+        self.stream.flush()
 
-    def debug(self, msg):
-        from_frame = inspect.stack()[1]
-        file = inspect.getfile(from_frame[0])
-        self.print_message(msg, "DEBUG", file, "bold")
-    
 
-    def info(self, msg):
-        from_frame = inspect.stack()[1]
-        file = inspect.getfile(from_frame[0])
-        self.print_message(msg, "INFO", file, "bold", "blue")
-    
+    def _log(self, level_name, msg, args, *styles):
+        if args:
+            msg = msg % args
+        # Two frames up is the caller of debug(), info() etc.
+        file = sys._getframe(2).f_code.co_filename
+        self.print_message(msg, level_name, file, *styles)
 
-    def warning(self, msg):
-        from_frame = inspect.stack()[1]
-        file = inspect.getfile(from_frame[0])
-        self.print_message(msg, "WARNING", file, "bold", "yellow")
 
+    def debug(self, msg, *args):
+        if self.level >= 4:
+            self._log("DEBUG", msg, args, "bold")
 
-    def error(self, msg):
-        from_frame = inspect.stack()[1]
-        file = inspect.getfile(from_frame[0])
-        self.print_message(msg, "ERROR", file, "bold", "red")
 
+    def info(self, msg, *args):
+        if self.level >= 3:
+            self._log("INFO", msg, args, "bold", "blue")
+
+
+    def warning(self, msg, *args):
+        if self.level >= 2:
+            self._log("WARNING", msg, args, "bold", "yellow")
+
+
+    def error(self, msg, *args):
+        if self.level >= 1:
+            self._log("ERROR", msg, args, "bold", "red")
+
+
+    def critical(self, msg, *args):
+        self._log("CRITICAL", msg, args, "bold", "red", "underline")
 
-    def critical(self, msg):
-        self.print_message(msg, "CRITICAL", file, "bold", "red", "underline")
-        
 
 
 def style(text, *styles):
@@ -89,9 +150,10 @@ def style(text, *styles):
         text = "\033[" + code[style] + "m" + text + "\033[0m"
 
     return text
-    
+
 
 def right_align(text, left_align_len=0):
     columns = shutil.get_terminal_size()[0]
     if left_align_len + len(text) < columns:
-        return(text.rjust(columns))
\ No newline at end of file
+        return(text.rjust(columns))
+    return ""
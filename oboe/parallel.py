@@ -0,0 +1,84 @@
+import os
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+from oboe.config import current, set_current
+from oboe import LOG
+
+
+def resolve_jobs(jobs):
+    """Number of worker processes to use. 0 or less means one per core."""
+    if jobs is None:
+        return 1
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+
+def _init_worker(config, log_level):
+    # Tasks run in the thread that ran the initializer, so the config stays active for all of them
+    set_current(config)
+    LOG.set_level(log_level)
+    # Workers exit without running atexit handlers, so anything buffered there would be lost
+    LOG.set_buffered(False)
+
+
+def _map_chunk(func, chunk):
+    return [func(item) for item in chunk]
+
+
+@contextmanager
+def worker_pool(jobs):
+    """A process pool of 'jobs' workers, for several calls of pool_map to share, or None for a
+    single job. The workers are started right away, so they can be forked before any threads are:
+    a process forked while another thread holds a lock, like that of a queue or of sys.stdout,
+    would find it locked forever."""
+    if jobs <= 1:
+        yield None
+        return
+
+    # Only imported once there is work for other processes, as it takes a while
+    from concurrent.futures import ProcessPoolExecutor
+    # Forked workers would otherwise inherit the buffered lines and write them again
+    LOG.flush()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(current(), LOG.level)) as pool:
+        # Forked workers all start with the first task, others as tasks come in
+        pool.submit(int).result()
+        yield pool
+
+
+def pool_map(func, items, jobs=1, chunksize=None, pool=None):
+    """Yields func(item) for every item, in input order. With more than one job, the work is
+    handed to a process pool in chunks, so only the items and results cross process boundaries.
+    Items are taken as the workers need them, so 'items' may be a generator, and only a few
+    chunks are held in memory at a time. Without a 'pool' from worker_pool, one is started for
+    this call alone."""
+    if jobs <= 1 or (hasattr(items, "__len__") and len(items) < 2):
+        yield from map(func, items)
+        return
+
+    if pool is None:
+        with worker_pool(jobs) as pool:
+            yield from pool_map(func, items, jobs, chunksize, pool)
+        return
+
+    if chunksize is None:
+        # A few chunks per worker evens out notes of very different sizes
+        chunksize = max(1, len(items) // (jobs * 4)) if hasattr(items, "__len__") else 16
+    items = iter(items)
+    pending = deque()
+
+    def submit():
+        chunk = list(islice(items, chunksize))
+        if chunk:
+            pending.append(pool.submit(_map_chunk, func, chunk))
+        return bool(chunk)
+
+    # Keep every worker busy, with one chunk each waiting in line
+    for _ in range(jobs * 2):
+        if not submit():
+            break
+
+    while pending:
+        results = pending.popleft().result()
+        submit()
+        yield from results
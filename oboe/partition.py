@@ -0,0 +1,101 @@
+import json
+import hashlib
+from oboe.Link import Link
+from oboe.NoteIndex import note_path
+from oboe import LOG
+
+LINKS_VERSION = 1
+
+
+class PartitionError(ValueError):
+    pass
+
+
+def parse_partition(text):
+    """Parses a partition given on the command line as "i/N", the i-th of N, counting from 1.
+    Returns (i, N), or None for no partition."""
+    if not text:
+        return None
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise PartitionError(f"Partition \"{text}\" is not of the form i/N, like 1/4") from None
+    if not 1 <= index <= count:
+        raise PartitionError(f"Partition \"{text}\" does not exist, partitions count from 1 to {count}")
+    return index, count
+
+
+def partition_of(key, count):
+    """The partition, from 1 to 'count', of the note with the key 'key'. Derived from a hash of
+    its path alone, so every machine agrees on it without knowing of the other notes."""
+    digest = hashlib.sha1(key.encode("utf8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+class LinkedNote:
+    """A note of another partition, known only by what it links to. Stands in for the Note in
+    the link graph, so backlinks to the notes of this partition come out the same."""
+    __slots__ = ("path", "title", "link", "targets", "tags")
+
+    def __init__(self, key, title, targets, tags):
+        self.path = note_path(key)
+        self.title = title
+        self.link = Link(title, target=key)
+        self.targets = tuple(targets)
+        self.tags = tuple(tags)
+
+    def __eq__(self, other):
+        return self.path == other.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+def write_links(notes, file, partition=None):
+    """Writes the title, link targets and tags of each of 'notes' to 'file' as JSON."""
+    data = {
+        "version": LINKS_VERSION,
+        "partition": list(partition) if partition else None,
+        "notes": {note.link.target: {"title": note.title, "targets": list(note.targets), "tags": list(note.tags)}
+                  for note in notes},
+    }
+    with open(file, "w", encoding="utf8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def merge_links(files, partition=None):
+    """Reads the link metadata written by write_links into 'files', and returns the notes in
+    them outside of 'partition' as LinkedNotes. Warns when partitions are missing."""
+    notes = {}
+    seen = set()
+    counts = set()
+    # Metadata of the whole vault covers every partition
+    complete = False
+    for file in files:
+        try:
+            with open(file, encoding="utf8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise PartitionError(f"Cannot read link metadata from \"{file}\": {e}") from None
+        if not isinstance(data, dict) or data.get("version") != LINKS_VERSION:
+            raise PartitionError(f"\"{file}\" is not link metadata written by this version of Oboe")
+
+        if data["partition"]:
+            seen.add(data["partition"][0])
+            counts.add(data["partition"][1])
+        else:
+            complete = True
+        for key, entry in data["notes"].items():
+            notes[key] = entry
+
+    if partition and counts:
+        counts.add(partition[1])
+    if len(counts) > 1:
+        raise PartitionError(f"Link metadata and build are split into different numbers of partitions: {sorted(counts)}")
+    if counts and not complete:
+        missing = set(range(1, counts.pop() + 1)) - seen - ({partition[0]} if partition else set())
+        if missing:
+            LOG.warning(f"No link metadata for partitions {sorted(missing)}, their links are left out of the backlinks.")
+
+    return [LinkedNote(key, entry["title"], entry["targets"], entry["tags"]) for key, entry in notes.items()
+            if not partition or partition_of(key, partition[1]) != partition[0]]
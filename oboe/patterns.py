@@ -0,0 +1,31 @@
+"""Regular expressions used on every note or link, compiled once at import."""
+import regex as re
+
+# slug_case: characters dropped from slugs, and runs of separators turned into a single dash
+SLUG_INVALID = re.compile(r"[^\w\s-]")
+SLUG_SEPARATORS = re.compile(r"[-\s]+")
+
+# Every piece of Obsidian syntax that needs converting, as one alternation. The scanner walks
+# the document once, and code is matched as a token of its own so nothing inside it is touched.
+# Links are found with it as well, so the link graph agrees with the converted notes.
+OBSIDIAN_SYNTAX = re.compile(r"""
+      (?P<code_block>```(?P<lang>.*)$\n(?P<code>[\S\s]*?)\n```)
+    | (?P<inline_code>`[^`\n]+`)
+    | (?P<embed>!)?\[\[(?P<link>.*?)\]\]
+    | ==(?P<highlight>.*?)==
+    | (?<=\s)\#(?P<tag>[\p{L}\d_-]+)
+    | [ ]\^(?P<blockref>.+)$
+""", re.MULTILINE | re.VERBOSE)
+
+# Link text with a header, alias or blockref after the path, e.g. "Note#Header" or "Note|Alias"
+EXTENDED_LINK = re.compile(r"([^#|^\n]+)([#|]\^?)(.*)")
+# Link targets only, as the old backlink search reads them
+LINK_TARGET = re.compile(r"\[{2}([^\]]*?)[|#\]]([^\]]*?)\]+")
+
+TAG = re.compile(r"\s#([\p{L}\d_-]+)")
+
+# Size of an embedded image, in place of its alias: "300" or "300x200"
+IMAGE_SIZE = re.compile(r"(\d+)(?:x(\d+))?")
+
+HTML_TAG = re.compile(r"<[^>]+>")
+STYLESHEET = re.compile(r'<link+.*rel="stylesheet"+.*href="(.+?)"')
@@ -0,0 +1,117 @@
+import json
+import cProfile
+import functools
+from time import perf_counter
+from contextlib import contextmanager
+
+
+class Profiler:
+    """Collects wall time, call counts and bytes processed per stage of a build, and the time each
+    note spent in every stage. Hooks check 'enabled' first, so they cost next to nothing when off."""
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self.notes = {}
+        self._note = None
+        # Time spent in nested stages, subtracted to get the time spent in a stage itself
+        self._children = []
+        self._cprofile = None
+
+
+    def enable(self, cprofile=False):
+        self.enabled = True
+        if cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+
+    @contextmanager
+    def note(self, path):
+        """Attributes the stages run inside the block to the note at 'path'. None keeps the current note."""
+        if not self.enabled or path is None:
+            yield
+            return
+        previous, self._note = self._note, path
+        try:
+            yield
+        finally:
+            self._note = previous
+
+
+    @contextmanager
+    def stage(self, name, size=0):
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        self._children.append(0.0)
+        try:
+            yield
+        finally:
+            self._record(name, perf_counter() - start, size)
+
+
+    def _record(self, name, elapsed, size):
+        own = elapsed - self._children.pop()
+        if self._children:
+            self._children[-1] += elapsed
+
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "self_seconds": 0.0, "calls": 0, "bytes": 0})
+        entry["seconds"] += elapsed
+        entry["self_seconds"] += own
+        entry["calls"] += 1
+        entry["bytes"] += size
+
+        if self._note is not None:
+            note = self.notes.setdefault(self._note, {})
+            note[name] = note.get(name, 0.0) + own
+
+
+    def report(self, slowest=10):
+        """Returns the profile as a dict, listing the 'slowest' notes and the stage each spent most time in."""
+        notes = sorted(self.notes.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return {
+            "stages": {name: dict(entry, seconds=round(entry["seconds"], 6), self_seconds=round(entry["self_seconds"], 6))
+                       for name, entry in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"])},
+            "slowest_notes": [
+                {
+                    "note": path,
+                    "seconds": round(sum(stages.values()), 6),
+                    "slowest_stage": max(stages, key=stages.get),
+                    "stages": {name: round(seconds, 6) for name, seconds in stages.items()},
+                }
+                for path, stages in notes[:slowest]
+            ],
+        }
+
+
+    def write_report(self, path, slowest=10):
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(self.report(slowest), f, indent=2)
+
+
+    def dump_cprofile(self, path):
+        """Writes the cProfile statistics, readable by pstats, snakeviz or flameprof."""
+        self._cprofile.disable()
+        self._cprofile.dump_stats(path)
+
+
+PROFILER = Profiler()
+
+
+def profiled(name, size=None, note=None):
+    """Decorator recording calls to the wrapped function as the stage 'name' while profiling.
+    'size' and 'note' get the call's arguments, and return the bytes processed and the path of the
+    note the call belongs to."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+
+            with PROFILER.note(note(*args, **kwargs) if note else None):
+                with PROFILER.stage(name, size(*args, **kwargs) if size else 0):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,145 @@
+import regex as re
+from oboe.utils import find_tags
+from oboe.NoteIndex import read_note
+
+OPERATORS = ("AND", "OR", "NOT")
+TOKEN = re.compile(r"\(|\)|[^\s()]+")
+
+
+class FilterError(ValueError):
+    pass
+
+
+def scan_tags(path):
+    """Reads only the tags of the note at 'path', without parsing anything else."""
+    return find_tags(read_note(path))
+
+
+def parse_filter(filter_list):
+    """Parses the tag filter given on the command line into an expression tree of nested tuples:
+    ("tag", name), ("not", expr), ("and", a, b) and ("or", a, b).
+
+    Without operators, the filter keeps its original meaning: notes with any of the tags, except
+    those with a tag prefixed by '.'. Otherwise it is a boolean expression of tags, AND, OR, NOT
+    and parentheses, e.g. "physics AND NOT (draft OR private)"."""
+    tokens = [token for elem in filter_list for token in TOKEN.findall(elem)]
+    if not tokens:
+        return None
+
+    if not any(token in OPERATORS or token in "()" for token in tokens):
+        include = [("tag", token.lstrip("#")) for token in tokens if not token.startswith(".")]
+        exclude = [("tag", token[1:]) for token in tokens if token.startswith(".")]
+        expr = _join("or", include) if include else None
+        if exclude:
+            excluded = ("not", _join("or", exclude))
+            expr = ("and", expr, excluded) if expr else excluded
+        return expr
+
+    parser = _Parser(tokens)
+    expr = parser.expr()
+    if parser.peek() is not None:
+        raise FilterError(f"Unexpected \"{parser.peek()}\" in tag filter")
+    return expr
+
+
+def _join(op, exprs):
+    expr = exprs[0]
+    for other in exprs[1:]:
+        expr = (op, expr, other)
+    return expr
+
+
+class _Parser:
+    """Recursive descent parser. NOT binds tighter than AND, which binds tighter than OR."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise FilterError("Tag filter ended unexpectedly")
+        self.pos += 1
+        return token
+
+
+    def expr(self):
+        expr = self.term()
+        while self.peek() == "OR":
+            self.take()
+            expr = ("or", expr, self.term())
+        return expr
+
+
+    def term(self):
+        expr = self.factor()
+        while self.peek() == "AND":
+            self.take()
+            expr = ("and", expr, self.factor())
+        return expr
+
+
+    def factor(self):
+        token = self.take()
+        if token == "NOT":
+            return ("not", self.factor())
+        if token == "(":
+            expr = self.expr()
+            if self.take() != ")":
+                raise FilterError("Missing \")\" in tag filter")
+            return expr
+        if token in OPERATORS or token == ")":
+            raise FilterError(f"Unexpected \"{token}\" in tag filter")
+        # Tags may be written with their # or the old negating .
+        if token.startswith("."):
+            return ("not", ("tag", token[1:]))
+        return ("tag", token.lstrip("#"))
+
+
+def tag_index(tags_per_note):
+    """Inverted index from each tag to a bitset (an int) of the notes carrying it."""
+    tags_per_note = list(tags_per_note)
+    size = (len(tags_per_note) + 7) // 8
+    # Bits are set in byte arrays first, as setting them on ints would copy the int every time
+    bits = {}
+    for i, tags in enumerate(tags_per_note):
+        for tag in tags:
+            if tag not in bits:
+                bits[tag] = bytearray(size)
+            bits[tag][i >> 3] |= 1 << (i & 7)
+
+    return {tag: int.from_bytes(array, "little") for tag, array in bits.items()}
+
+
+def members(bitset, count):
+    """Indices of the bits set in 'bitset', out of 'count'."""
+    array = bitset.to_bytes((count + 7) // 8, "little")
+    return [i for i in range(count) if array[i >> 3] >> (i & 7) & 1]
+
+
+def evaluate(expr, index, count):
+    """Returns the bitset of the 'count' notes matching 'expr', given the index of their tags."""
+    op = expr[0]
+    if op == "tag":
+        return index.get(expr[1], 0)
+    if op == "not":
+        return ((1 << count) - 1) & ~evaluate(expr[1], index, count)
+    if op == "and":
+        return evaluate(expr[1], index, count) & evaluate(expr[2], index, count)
+    return evaluate(expr[1], index, count) | evaluate(expr[2], index, count)
+
+
+def describe(expr):
+    """The expression as text, for logging."""
+    op = expr[0]
+    if op == "tag":
+        return expr[1]
+    if op == "not":
+        return f"NOT {describe(expr[1])}"
+    return f"({describe(expr[1])} {op.upper()} {describe(expr[2])})"
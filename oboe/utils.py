@@ -1,17 +1,22 @@
-import regex as re
 import os
-import markdown2
+import tempfile
+import unicodedata
+from functools import lru_cache
 from oboe import GLOBAL
-from oboe import LOG
+from oboe.profiling import profiled
+from oboe.patterns import SLUG_INVALID, SLUG_SEPARATORS, LINK_TARGET, TAG
 
+# Number of slugs remembered. The same titles and headers are slugged for every link to them.
+SLUG_CACHE_SIZE = 16384
 
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
 def slug_case(text):
     # Function from django/utils/text.py, should output the same as markdown2's variant
-    import unicodedata
     text = str(text)
     text = unicodedata.normalize('NFKC', text)
-    text = re.sub(r'[^\w\s-]', '', text.lower())
-    return re.sub(r'[-\s]+', '-', text).strip('-_')
+    text = SLUG_INVALID.sub('', text.lower())
+    return SLUG_SEPARATORS.sub('-', text).strip('-_')
 
 
 def md_link(text, link, extended=""):
@@ -19,7 +24,7 @@ def md_link(text, link, extended=""):
 
 
 def extract_links_from_file(document):
-    matches = re.finditer(r"\[{2}([^\]]*?)[|#\]]([^\]]*?)\]+", document)
+    matches = LINK_TARGET.finditer(document)
 
     links = []
     for match in matches:
@@ -43,51 +48,74 @@ def find_backlinks(target_note_name, all_notes):
 
 
 def find_tags(document):
-    tags = [match.group(1) for match in re.finditer(r"\s#([\p{L}\d_-]+)", document)]
+    tags = [match.group(1) for match in TAG.finditer(document)]
     # Sort by length (longest first) to fix issues pertaining to tags beginning with the same word.
     tags.sort(key=lambda x: len(x), reverse=True)
 
     return tags
 
 
+# Files get the permissions open() would give them, which temporary files don't
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+@profiled("write", size=lambda text, file: len(text.encode("utf8")))
 def write(text, file):
-    with open(file, "w", encoding="utf8") as f:
-        f.write(text)
-
-
-def find_subdirs_recursively(root):
-    subfolders = [f.path for f in os.scandir(root) if f.is_dir() and "." not in f.path]
-    for dirname in subfolders:
-        subfolders.extend(find_subdirs_recursively(dirname))
-
-    return subfolders
-
-
-def render_markdown(text):
-    # Escaped curly braces lose their escapes when formatted. I'm suspecting
-    # this is from markdown2, as I haven't found anyplace which could
-    # do this among my own formatter functions. Therefore I double escape them.
-    text = text.replace(r"\{", r"\\{").replace(r"\}", r"\\}")
-
-    markdown2_extras = [
-        # Parser should work withouth strict linebreaks.
-        "break-on-newline",
-        # Make slug IDs for each header. Needed for internal header links.
-        "header-ids",
-        # Support for strikethrough formatting.
-        "strike",
-        # GFM tables.
-        "tables",
-        # Support for lists that start without a newline directly above.
-        "cuddled-lists",
-        # Support Markdown inside html tags
-        "markdown-in-html",
-        # Disable formatting via the _ character. Necessary for code and TeX
-        "code-friendly",
-        # Support for Obsidian's footnote syntax
-        "footnotes",
-        # Enable task list checkboxes - [ ]
-        "task_list"
-    ]
-
-    return markdown2.markdown(text, extras=markdown2_extras)
+    """Writes 'text' to 'file', unless the file already holds exactly that, so unchanged files
+    keep their mtime. Returns whether the file was written."""
+    return write_bytes(encode(text), file)
+
+
+def encode(text):
+    """The bytes open() in text mode would write for 'text'."""
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf8")
+
+
+def write_bytes(data, file):
+    """Writes 'data' to 'file' like write does. The file is replaced atomically, so nobody reads
+    half a file."""
+    # Comparing sizes rules out most changed files without reading them
+    try:
+        if os.path.getsize(file) == len(data):
+            with open(file, "rb") as f:
+                if f.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+
+    fd, temp = tempfile.mkstemp(prefix=".oboe-", suffix=".tmp", dir=os.path.dirname(file) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(temp, 0o666 & ~UMASK)
+        os.replace(temp, file)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+    return True
+
+
+MARKDOWN2_EXTRAS = [
+    # Parser should work withouth strict linebreaks.
+    "break-on-newline",
+    # Make slug IDs for each header. Needed for internal header links.
+    "header-ids",
+    # Support for strikethrough formatting.
+    "strike",
+    # GFM tables.
+    "tables",
+    # Support for lists that start without a newline directly above.
+    "cuddled-lists",
+    # Support Markdown inside html tags
+    "markdown-in-html",
+    # Disable formatting via the _ character. Necessary for code and TeX
+    "code-friendly",
+    # Support for Obsidian's footnote syntax
+    "footnotes",
+    # Enable task list checkboxes - [ ]
+    "task_list"
+]
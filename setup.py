@@ -14,6 +14,10 @@ setup(
       'regex',
       'pypandoc'
     ],
+    extras_require={
+      'mistune': ['mistune>=3'],
+      'brotli': ['brotli']
+    },
     zip_safe=False,
     entry_points={
         'console_scripts': [
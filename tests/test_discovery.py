@@ -0,0 +1,50 @@
+import os
+import json
+import pytest
+from oboe.discovery import IgnoreRules, load_rules, scan
+
+
+def write(path, text=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf8") as f:
+        f.write(text)
+
+
+@pytest.mark.parametrize("patterns, path, is_dir, ignored", [
+    (["*.excalidraw.md"], "sub/Drawing.excalidraw.md", False, True),
+    (["Templates/"], "Templates", True, True),
+    (["Templates/"], "Templates", False, False),
+    (["/Daily"], "Daily", True, True),
+    (["/Daily"], "sub/Daily", True, False),
+    (["a/**/b.md"], "a/x/y/b.md", False, True),
+    (["a/**/b.md"], "a/b.md", False, True),
+    (["draft?.md"], "draft1.md", False, True),
+    (["draft[!0-9].md"], "draft1.md", False, False),
+    (["*.md", "!Keep.md"], "sub/Keep.md", False, False),
+    (["# comment", ""], "# comment", False, False),
+])
+def test_gitignore_patterns(patterns, path, is_dir, ignored):
+    assert IgnoreRules(patterns).ignored(path, is_dir) == ignored
+
+
+def test_obsidian_filters():
+    rules = IgnoreRules(filters=["Archive/", "/secret-\\d+/"])
+    assert rules.ignored("Archive", is_dir=True)
+    assert rules.ignored("Archive/Old.md")
+    assert rules.ignored("notes/secret-12.md")
+    assert not rules.ignored("Archived.md")
+    assert not IgnoreRules()
+
+
+def test_scan_skips_ignored_and_hidden_files(tmp_path):
+    root = str(tmp_path)
+    for path in ("Home.md", "Templates/Daily.md", "sub/Note.md", "sub/image.png", "sub/Old.md", ".trash/Gone.md"):
+        write(os.path.join(root, *path.split("/")))
+    write(os.path.join(root, ".oboeignore"), "Templates/\n")
+    write(os.path.join(root, ".obsidian", "app.json"), json.dumps({"userIgnoreFilters": ["sub/Old"]}))
+
+    rules = load_rules(root, exclude=["*.png"])
+    assert [path for path, entry in scan(root, rules=rules)] == ["Home.md", "sub/Note.md"]
+    # Only the files directly in the given folders
+    assert [path for path, entry in scan(root, folders=[os.path.join(root, "sub")])] == \
+        ["sub/Note.md", "sub/Old.md", "sub/image.png"]
@@ -0,0 +1,31 @@
+from oboe.Embeds import extract_section
+
+NOTE = """# Setup
+
+```bash
+# install
+pip install oboe
+```
+
+Then run it.
+
+~~~
+# not a heading either
+~~~
+
+## Usage
+
+Run oboe.
+
+# Next
+"""
+
+
+def test_section_skips_headings_in_code():
+    section = extract_section(NOTE, "Setup")
+    assert section.startswith("# Setup") and section.endswith("## Usage\n\nRun oboe.")
+
+
+def test_heading_in_code_is_not_a_section():
+    assert extract_section(NOTE, "install") is None
+    assert extract_section(NOTE, "Usage") == "## Usage\n\nRun oboe."
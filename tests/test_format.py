@@ -0,0 +1,44 @@
+import pytest
+from oboe import BuildConfig
+from oboe.NoteIndex import NoteIndex
+from oboe.Link import links_in_text
+from oboe.format import convert_obsidian_syntax
+
+
+@pytest.fixture
+def convert():
+    config = BuildConfig(vault_root="vault")
+    with config.active():
+        config.NOTE_INDEX = NoteIndex(["vault/Other.md", "vault/sub/Deep.md"])
+
+    def convert(text):
+        with config.active():
+            return convert_obsidian_syntax(text, links_in_text(text))
+    return convert
+
+
+def test_tags(convert):
+    assert convert("Tagged #physics and #draft-ish, not a#b or # heading") == \
+        'Tagged <span class="tag">physics</span> and <span class="tag">draft-ish</span>, not a#b or # heading'
+
+
+def test_links(convert):
+    assert convert("[[Other]] [[Deep|d]] [[Nope]]") == \
+        "[Other](_oboe_root_/other) [d](_oboe_root_/sub/deep) [Nope](nope)"
+
+
+def test_code_is_left_alone(convert):
+    assert convert("`[[Other]] #tag` stays") == "`[[Other]] #tag` stays"
+    assert convert("```py\nx = [[Other]] #tag\n```\n") == \
+        '<pre><code class="py lang-py language-py">x = [[Other]] #tag</code></pre>\n'
+    assert convert("```\nplain\n```") == \
+        '<pre><code class="plaintext lang-plaintext language-plaintext">plain</code></pre>'
+
+
+def test_syntax_inside_highlights(convert):
+    assert convert("==hi [[Other]] #tag==") == \
+        '<mark class="highlight">hi [Other](_oboe_root_/other) <span class="tag">tag</span></mark>'
+
+
+def test_blockref(convert):
+    assert convert("A paragraph ^block1\nNext") == 'A paragraph<span id="block1"></span>\nNext'
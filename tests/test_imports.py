@@ -0,0 +1,36 @@
+import sys
+import subprocess
+import pytest
+
+CLASSES = ("Vault", "Note", "Watcher", "Server")
+
+
+def run(code):
+    # Each order of imports needs a fresh interpreter
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+@pytest.mark.parametrize("name", CLASSES)
+def test_package_first(name):
+    run(f"from oboe import {name} as a\n"
+        f"import oboe.{name}\n"
+        f"from oboe.{name} import {name} as b\n"
+        f"from oboe import {name} as c\n"
+        f"assert isinstance(a, type) and a is b is c")
+
+
+@pytest.mark.parametrize("name", CLASSES)
+def test_submodule_first(name):
+    run(f"import oboe.{name}\n"
+        f"from oboe.{name} import {name} as a\n"
+        f"from oboe import {name} as b\n"
+        f"import oboe\n"
+        f"assert isinstance(a, type) and a is b is oboe.{name}")
+
+
+def test_imported_by_other_modules():
+    # Vault imports Note itself, before anyone asks the package for it
+    run("from oboe import Vault\n"
+        "from oboe import Note\n"
+        "from oboe.Note import Note as N\n"
+        "assert isinstance(Note, type) and Note is N")
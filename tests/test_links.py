@@ -0,0 +1,38 @@
+from oboe import BuildConfig
+from oboe.Vault import Vault
+from oboe.NoteIndex import NoteIndex
+
+TEMPLATE = "{content}{backlinks}"
+
+
+def build(sources, **options):
+    config = BuildConfig(vault_root="vault", output_dir="html", sources=sources, **options)
+    return Vault(config=config, template=TEMPLATE).build()
+
+
+def test_links_point_to_the_page_of_their_note():
+    pages = build({"Home.md": "See [[Deep Note]] and [[Deep Note#Some Part]].",
+                   "sub/deep/Deep Note.md": "Back [[Home]].",
+                   "sub/Other.md": "Down [[deep/Deep Note]]."})
+    assert '<a href="./sub/deep/deep-note">Deep Note</a>' in pages["home.html"]
+    assert '<a href="./sub/deep/deep-note#some-part">Some Part</a>' in pages["home.html"]
+    assert '<a href="../../home">Home</a>' in pages["sub/deep/deep-note.html"]
+    assert '<a href="../sub/deep/deep-note">' in pages["sub/other.html"]
+
+
+def test_missing_notes_keep_their_slug():
+    pages = build({"Home.md": "See [[Not There]]."}, html_link_extensions=True)
+    assert '<a href="not-there.html">Not There</a>' in pages["home.html"]
+
+
+def test_index_resolves_like_obsidian():
+    with BuildConfig(vault_root="vault").active():
+        index = NoteIndex(["vault/Home.md", "vault/a/Note.md", "vault/b/c/Note.md", "vault/b/Only.md"])
+    # Full paths from the root, and path suffixes
+    assert index.resolve("b/c/Note") == "b/c/Note"
+    assert index.resolve("c/Note") == "b/c/Note"
+    assert index.resolve("Only.md") == "b/Only"
+    # Ambiguous names take the note closest to the root, ignoring case
+    assert index.resolve("note") == "a/Note"
+    assert index.resolve("ome") is None
+    assert index.resolve("x/Note") is None
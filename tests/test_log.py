@@ -0,0 +1,49 @@
+import io
+import time
+from oboe import LOG
+from oboe.log import Logger
+from oboe.Watcher import Watcher
+
+
+class Pipe(io.StringIO):
+    """Output that is not a terminal, and counts how often it is flushed."""
+    flushes = 0
+
+    def isatty(self):
+        return False
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_unbuffered_messages_are_written_at_once():
+    stream = Pipe()
+    log = Logger("INFO", stream=stream)
+    log.info("Buffered")
+    assert stream.getvalue() == ""
+
+    log.set_buffered(False)
+    assert stream.getvalue().startswith("INFO: Buffered")
+    flushes = stream.flushes
+    log.info("Written")
+    assert "INFO: Written" in stream.getvalue() and stream.flushes > flushes
+
+
+def test_watching_writes_messages_at_once(monkeypatch):
+    class Vault:
+        class config:
+            VAULT_ROOT = "."
+        render_cache = None
+
+        def files(self):
+            return []
+
+    def stop(seconds):
+        raise KeyboardInterrupt
+
+    stream = Pipe()
+    monkeypatch.setattr(LOG, "_stream", stream)
+    monkeypatch.setattr(LOG, "buffered", None)
+    monkeypatch.setattr(time, "sleep", stop)
+    Watcher(Vault()).run()
+    assert "INFO: Watching" in stream.getvalue() and "INFO: Stopped watching." in stream.getvalue()
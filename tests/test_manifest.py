@@ -0,0 +1,68 @@
+import os
+from oboe import BuildConfig
+from oboe.Vault import Vault
+from oboe.Manifest import Manifest
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf8") as f:
+        f.write(text)
+
+
+def to_render(config, **options):
+    """Titles of the notes an incremental build of 'config' would render."""
+    vault = Vault(config=config, incremental=True, **options)
+    with config.active():
+        return sorted(note.title for note in vault._notes_to_render())
+
+
+def test_sources_build_incrementally(tmp_path):
+    out = str(tmp_path / "html")
+    sources = {"Home.md": "See [[Other]].", "Notes/Other.md": "Hello!"}
+    Vault(config=BuildConfig(output_dir=out, sources=sources), incremental=True).export_html()
+    assert os.path.isfile(os.path.join(out, "Notes", "other.html"))
+    assert to_render(BuildConfig(output_dir=out, sources=sources)) == []
+
+    sources["Notes/Other.md"] = "Changed!"
+    assert to_render(BuildConfig(output_dir=out, sources=sources)) == ["Other"]
+
+
+def test_fingerprint():
+    with BuildConfig().active():
+        fingerprint = Manifest.build_fingerprint("{content}", ["gzip"])
+        assert Manifest.build_fingerprint("{content}", ["gzip"]) == fingerprint
+        assert Manifest.build_fingerprint("<p>{content}</p>", ["gzip"]) != fingerprint
+        assert Manifest.build_fingerprint("{content}", []) != fingerprint
+    with BuildConfig(html_link_extensions=True).active():
+        assert Manifest.build_fingerprint("{content}", ["gzip"]) != fingerprint
+
+
+def test_only_changed_notes_are_rendered(tmp_path):
+    root, out = str(tmp_path / "vault"), str(tmp_path / "html")
+    write(os.path.join(root, "Home.md"), "See [[Other]].")
+    write(os.path.join(root, "Other.md"), "Hello!")
+    write(os.path.join(root, "Alone.md"), "By itself.")
+
+    def config():
+        return BuildConfig(vault_root=root, output_dir=out)
+
+    Vault(config=config(), incremental=True).export_html()
+    assert to_render(config()) == []
+
+    # A new backlink renders the note it points to again
+    write(os.path.join(root, "Alone.md"), "Now with [[Other]].")
+    assert to_render(config()) == ["Alone", "Other"]
+    Vault(config=config(), incremental=True).export_html()
+
+    # So does a missing page
+    os.remove(os.path.join(out, "home.html"))
+    assert to_render(config()) == ["Home"]
+
+    # Removed notes take their page with them
+    os.remove(os.path.join(root, "Home.md"))
+    Vault(config=config(), incremental=True).export_html()
+    assert sorted(os.listdir(out)) == [".oboe-manifest.json", "alone.html", "other.html"]
+
+    # Changed options render everything again
+    assert to_render(config(), precompress=["gzip"]) == ["Alone", "Other"]
@@ -0,0 +1,29 @@
+import os
+import threading
+from oboe import BuildConfig
+from oboe.Vault import Vault
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf8") as f:
+        f.write(text)
+
+
+def test_workers_fork_before_threads_start(tmp_path, monkeypatch):
+    root, out = str(tmp_path / "vault"), str(tmp_path / "html")
+    for name in ("Alpha", "Beta", "Gamma"):
+        write(os.path.join(root, f"{name}.md"), f"# {name}\n\nSee [[Alpha]].")
+
+    # Threads running in the process at each fork
+    threads = []
+    fork = os.fork
+
+    def counted_fork():
+        threads.append(threading.active_count())
+        return fork()
+
+    monkeypatch.setattr(os, "fork", counted_fork)
+    Vault(config=BuildConfig(vault_root=root, output_dir=out), jobs=2).export_html()
+    assert threads and set(threads) == {1}
+    assert os.path.isfile(os.path.join(out, "gamma.html"))
@@ -0,0 +1,89 @@
+import os
+import sys
+import subprocess
+import pytest
+from oboe import BuildConfig
+from oboe.Vault import Vault
+from oboe.partition import parse_partition, partition_of, merge_links, write_links, LinkedNote, PartitionError
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf8") as f:
+        f.write(text)
+
+
+def test_partition_is_not_incremental(tmp_path):
+    root, out = str(tmp_path / "vault"), str(tmp_path / "html")
+    write(os.path.join(root, "Alpha.md"), "First.")
+    result = subprocess.run([sys.executable, "-m", "oboe", root, "-o", out, "-i", "--partition", "1/2"],
+                            capture_output=True, text=True)
+    assert "can't be built incrementally" in result.stdout
+    assert not os.path.exists(out)
+
+
+def test_parse_partition():
+    assert parse_partition("2/4") == (2, 4)
+    assert parse_partition(None) is None
+    for text in ("0/4", "5/4", "2", "a/b"):
+        with pytest.raises(PartitionError):
+            parse_partition(text)
+
+
+def test_partitions_cover_every_note():
+    keys = [f"sub/Note {i}" for i in range(200)]
+    partitions = [partition_of(key, 4) for key in keys]
+    assert set(partitions) == {1, 2, 3, 4}
+    assert partitions == [partition_of(key, 4) for key in keys]
+
+
+def test_merge_links(tmp_path):
+    with BuildConfig(vault_root="vault").active():
+        notes = {key: LinkedNote(key, key.rsplit("/", 1)[-1], ["Home"], ["tag"]) for key in ("Home", "a/B", "a/C", "D")}
+        files = {}
+        for index in (1, 2, 3):
+            files[index] = str(tmp_path / f"links-{index}.json")
+            write_links([note for key, note in notes.items() if partition_of(key, 3) == index], files[index], (index, 3))
+
+        # The notes of the partition being built are left out
+        merged = merge_links([files[1], files[2], files[3]], (1, 3))
+        assert sorted(note.link.target for note in merged) == sorted(key for key in notes if partition_of(key, 3) != 1)
+        assert all(note.targets == ("Home",) and note.tags == ("tag",) for note in merged)
+
+        # Metadata split into a different number of partitions doesn't fit
+        with pytest.raises(PartitionError):
+            merge_links([files[1]], (1, 2))
+
+
+def pages(out):
+    """The HTML of every page under 'out', by its path."""
+    found = {}
+    for folder, _, names in os.walk(out):
+        for name in names:
+            if name.endswith(".html"):
+                with open(os.path.join(folder, name), encoding="utf8") as f:
+                    found[os.path.relpath(os.path.join(folder, name), out)] = f.read()
+    return found
+
+
+def test_partitions_add_up_to_a_full_build(tmp_path):
+    root = str(tmp_path / "vault")
+    for i in range(12):
+        write(os.path.join(root, f"sub{i % 3}", f"Note {i}.md"), f"Note {i} links [[Note {(i + 1) % 12}]] and [[Note {(i * 5) % 12}]].")
+
+    def vault(out, **options):
+        return Vault(config=BuildConfig(vault_root=root, output_dir=str(tmp_path / out)), **options)
+
+    vault("full").export_html()
+    links = [str(tmp_path / f"links-{index}.json") for index in (1, 2, 3)]
+    for index in (1, 2, 3):
+        vault("parts", partition=(index, 3)).export_html()
+        # A first round writing the link metadata, which the other builds merge
+        vault("links", partition=(index, 3), links=[]).export_links(links[index - 1])
+    for index in (1, 2, 3):
+        vault("merged", partition=(index, 3), links=links).export_html()
+
+    full = pages(str(tmp_path / "full"))
+    assert len(full) == 12
+    assert pages(str(tmp_path / "parts")) == full
+    assert pages(str(tmp_path / "merged")) == full
@@ -0,0 +1,39 @@
+import os
+import gzip
+from oboe import BuildConfig
+from oboe.Vault import Vault
+from oboe.Writer import Writer
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf8") as f:
+        f.write(text)
+
+
+def build(root, out, **options):
+    Vault(config=BuildConfig(vault_root=root, output_dir=out), **options).export_html()
+
+
+def test_siblings_follow_the_page(tmp_path):
+    root, out = str(tmp_path / "vault"), str(tmp_path / "html")
+    write(os.path.join(root, "Alpha.md"), "First.")
+    build(root, out, precompress=["gzip"])
+    page = os.path.join(out, "alpha.html")
+    with open(page, "rb") as f, gzip.open(page + ".gz") as g:
+        assert g.read() == f.read()
+
+    # Without --precompress, the old sibling would go on serving the first version
+    write(os.path.join(root, "Alpha.md"), "Second.")
+    build(root, out)
+    assert not os.path.exists(page + ".gz")
+
+
+
+def test_deleted_page_takes_every_sibling(tmp_path):
+    page = str(tmp_path / "alpha.html")
+    for file in (page, page + ".gz", page + ".br"):
+        write(file, "Old.")
+    with Writer() as writer:
+        writer.delete(page)
+    assert os.listdir(tmp_path) == []
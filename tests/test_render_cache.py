@@ -0,0 +1,37 @@
+import time
+import zlib
+import itertools
+from oboe.RenderCache import RenderCache
+
+PAGES = {name: f"<p>{name * 500}</p>" for name in "abc"}
+
+
+def test_least_recently_used_are_evicted(monkeypatch):
+    # A clock ticking once per call, so every use has its own time
+    clock = itertools.count()
+    monkeypatch.setattr(time, "time_ns", lambda: next(clock))
+    size = len(zlib.compress(PAGES["a"].encode("utf8")))
+    cache = RenderCache(":memory:", max_bytes=2 * size)
+    keys = {name: cache.key(name) for name in PAGES}
+
+    cache.put(keys["a"], PAGES["a"])
+    cache.put(keys["b"], PAGES["b"])
+    cache.commit()
+    assert cache.get(keys["a"]) == PAGES["a"]
+    assert cache.get(keys["c"]) is None
+    cache.put(keys["c"], PAGES["c"])
+    cache.commit()
+
+    # b was used least recently, and the cache only holds two pages
+    assert cache.get(keys["b"]) is None
+    assert cache.get(keys["a"]) == PAGES["a"] and cache.get(keys["c"]) == PAGES["c"]
+    cache.close()
+
+
+def test_keys_depend_on_the_renderer():
+    cache = RenderCache(":memory:")
+    key = cache.key("# Title")
+    assert cache.key("# Title") == key and cache.key("# Other") != key
+    cache.salt += b"other renderer"
+    assert cache.key("# Title") != key
+    cache.close()
@@ -0,0 +1,112 @@
+"""Every renderer turns the Markdown Oboe produces into the same HTML as markdown2. Each case is
+Obsidian syntax converted by format.py, like a build would, and the HTML is compared after
+normalizing whitespace and attribute order."""
+from html.parser import HTMLParser
+import pytest
+
+from oboe import BuildConfig
+from oboe.Link import links_in_text
+from oboe.Embeds import Embeds
+from oboe.NoteIndex import NoteIndex
+from oboe.format import convert_obsidian_syntax
+from oboe.Renderer import RendererError, get_renderer
+
+REFERENCE = "markdown2"
+
+CASES = {
+    "heading": "# A heading\n\nSome text.",
+    "line breaks": "First line\nsecond line",
+    "emphasis": "Some *emphasis*, **strong** and ~~struck~~ text.",
+    "tag": "Tagged #physics and #draft-ish.",
+    "link": "See [[Second note]] and [[Missing]].",
+    "link alias": "See [[Second note|the second note]].",
+    "link header": "See [[Second note#Some header]].",
+    "link blockref": "See [[Second note#^block1]].",
+    "highlight": "Some ==highlighted== text.",
+    "highlight with tag": "Some ==highlighted #tag== text.",
+    "blockref": "A paragraph to refer to. ^block1",
+    "inline code": "Keeps `inline [[code]] and #tags` as is.",
+    "code block": "```python\ndef f(x):\n    return x < 1 and x > 0\n```",
+    "code block without language": "```\nplain [[text]]\n```",
+    "list": "- one\n- two [[Second note]]\n- three",
+    "backlinks": "\n<div class=\"backlinks\" markdown=\"1\">\n- [Home](home)\n- [Second note](second-note)\n</div>",
+    "embed": "Before.\n\n![[Second note]]\n\nAfter.",
+    "embed header": "![[Second note#Some header]]",
+    "embed blockref": "Quoting ![[Second note#^block1]]",
+    "nested embed": "![[Home]]",
+    "image": "An image ![[diagrams/flow chart.png]] inline.",
+    "image alone": "![[flow chart.png|A chart]]",
+    "image size": "![[flow chart.png|300x200]]",
+    "attachment": "See [[report.pdf]].",
+}
+
+# Text of the notes the cases embed
+NOTES = {
+    "Home": "# Home\n\nIntro.\n\n![[Second note#Some header]]",
+    "Second note": "Text before.\n\n## Some header\n\nUnder the *header*. ^block1\n\n## Other header\n\nNot embedded.",
+}
+
+# Attributes renderers add, and tags they use interchangeably, without changing what the page looks like
+IGNORED_ATTRIBUTES = {"data-markdown"}
+EQUIVALENT_TAGS = {"del": "s"}
+
+
+class _Normalizer(HTMLParser):
+    """Reduces HTML to a list of tags, with sorted attributes, and text with collapsed whitespace."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens = []
+
+
+    def handle_starttag(self, tag, attrs):
+        attrs = sorted((name, value) for name, value in attrs if name not in IGNORED_ATTRIBUTES)
+        self.tokens.append(("start", EQUIVALENT_TAGS.get(tag, tag), tuple(attrs)))
+
+
+    def handle_endtag(self, tag):
+        self.tokens.append(("end", EQUIVALENT_TAGS.get(tag, tag)))
+
+
+    def handle_data(self, data):
+        text = " ".join(data.split())
+        if text:
+            self.tokens.append(("text", text))
+
+
+def normalize(html):
+    parser = _Normalizer()
+    parser.feed(html)
+    parser.close()
+    return parser.tokens
+
+
+@pytest.fixture(scope="module")
+def config():
+    config = BuildConfig(vault_root="vault")
+    with config.active():
+        config.NOTE_INDEX = NoteIndex([f"vault/{name}.md" for name in NOTES])
+        config.ATTACHMENTS = NoteIndex(["vault/diagrams/flow chart.png", "vault/report.pdf"])
+        config.EMBEDS = Embeds()
+    # Embedded notes are read from here instead of from disk
+    config.EMBEDS.texts.update(NOTES)
+    return config
+
+
+def installed(name):
+    """The renderer called 'name', skipping the test if it isn't installed."""
+    if name == "mistune":
+        pytest.importorskip("mistune")
+    try:
+        return get_renderer(name)
+    except RendererError as e:
+        pytest.skip(str(e))
+
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("name", ["mistune", "pandoc"])
+def test_same_html_as_markdown2(config, name, case):
+    renderer = installed(name)
+    with config.active():
+        text = convert_obsidian_syntax(CASES[case], links_in_text(CASES[case]))
+        assert normalize(renderer.render(text)) == normalize(get_renderer(REFERENCE).render(text))
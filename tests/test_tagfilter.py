@@ -0,0 +1,45 @@
+import pytest
+from oboe.tagfilter import parse_filter, tag_index, evaluate, members, describe, FilterError
+
+# Tags of the notes the filters are evaluated on
+NOTES = [
+    ["physics"],
+    ["physics", "draft"],
+    ["chemistry"],
+    ["physics", "chemistry", "private"],
+    [],
+]
+
+
+def matching(*filter_list):
+    index = tag_index(NOTES)
+    return members(evaluate(parse_filter(list(filter_list)), index, len(NOTES)), len(NOTES))
+
+
+def test_plain_tags_keep_their_meaning():
+    assert matching("physics", "chemistry") == [0, 1, 2, 3]
+    assert matching("#physics", ".chemistry") == [0, 1]
+    # Only exclusions keep every other note
+    assert matching(".physics") == [2, 4]
+
+
+def test_expressions():
+    assert matching("physics AND NOT (draft OR private)") == [0]
+    assert matching("physics", "AND", "chemistry") == [3]
+    assert matching("NOT physics") == [2, 4]
+
+
+def test_precedence():
+    # NOT binds tighter than AND, which binds tighter than OR
+    assert parse_filter(["NOT a AND b OR c"]) == ("or", ("and", ("not", ("tag", "a")), ("tag", "b")), ("tag", "c"))
+    assert describe(parse_filter(["a OR b AND c"])) == "(a OR (b AND c))"
+
+
+def test_no_filter():
+    assert parse_filter([]) is None
+
+
+@pytest.mark.parametrize("text", ["physics AND", "(physics OR draft", "physics draft)", "AND physics", "NOT"])
+def test_malformed_filters(text):
+    with pytest.raises(FilterError):
+        parse_filter([text])
@@ -0,0 +1,32 @@
+from oboe import BuildConfig
+from oboe.Template import Template, SITE_ROOT, LITERAL, FIELD, ASSET
+
+
+def render(template, out_dir="html", **fields):
+    with BuildConfig(output_dir="html").active():
+        return template.render(out_dir, **fields)
+
+
+def test_compiles_into_segments():
+    template = Template('<link href="style.css"><h1>{title}</h1>{content}', ["style.css"])
+    assert template.segments == [(LITERAL, "<link "), (ASSET, "style.css"), (LITERAL, "><h1>"),
+                                 (FIELD, "title"), (LITERAL, "</h1>"), (FIELD, "content")]
+
+
+def test_other_braces_are_kept():
+    template = Template("<div id=\"app\">{{ message }}</div><script>x = {a: 1};</script>{content}{missing}")
+    assert render(template, content="Hi") == "<div id=\"app\">{{ message }}</div><script>x = {a: 1};</script>Hi{missing}"
+
+
+def test_legacy_templates_unescape_double_braces():
+    template = Template("<style>p {{ color: red; }}</style>{content}", format_escapes=True)
+    assert render(template, content="Hi") == "<style>p { color: red; }</style>Hi"
+
+
+def test_paths_are_relative_to_each_page():
+    template = Template('<link rel="stylesheet" href="css/style.css">{content}', ["css/style.css"])
+    content = f"<img src=\"{SITE_ROOT}image.png\">"
+    assert render(template, "html", content=content) == \
+        '<link rel="stylesheet" href="./css/style.css"><img src="./image.png">'
+    assert render(template, "html/sub/deep", content=content) == \
+        '<link rel="stylesheet" href="../../css/style.css"><img src="../../image.png">'
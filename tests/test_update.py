@@ -0,0 +1,34 @@
+import os
+from oboe import BuildConfig
+from oboe.Vault import Vault
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf8") as f:
+        f.write(text)
+
+
+def test_added_note_shadows_link(tmp_path):
+    root, out = str(tmp_path / "vault"), str(tmp_path / "html")
+    write(os.path.join(root, "Home.md"), "See [[Child]].")
+    write(os.path.join(root, "sub", "Child.md"), "Deeper.")
+    vault = Vault(config=BuildConfig(vault_root=root, output_dir=out))
+    vault.export_html()
+
+    # A note closer to the root takes over the link
+    child = os.path.join(root, "Child.md")
+    write(child, "Closer.")
+    vault.update(changed=[child])
+
+    notes = {note.link.target: note for note in vault.notes}
+    assert notes["Home"].targets == ("Child",)
+    assert [link.target for link in notes["Child"].backlinks] == ["Home"]
+    assert notes["sub/Child"].backlinks == []
+
+    os.remove(child)
+    vault.update(removed=[child])
+
+    notes = {note.link.target: note for note in vault.notes}
+    assert notes["Home"].targets == ("sub/Child",)
+    assert [link.target for link in notes["sub/Child"].backlinks] == ["Home"]